@@ -0,0 +1,426 @@
+"""Benchmark the Atspi backend against synthetic accessibility trees.
+
+The Accessible objects handed to the backend are pure-Python fakes that
+implement the methods AtspiBackend calls. Every method call that would
+be a D-Bus round trip against a real application is counted (and can
+optionally be slowed down to simulate D-Bus latency), so the numbers
+are reproducible and no desktop or accessibility bus is needed.
+
+Atspi enums and match rules still come from the real typelib, so run it
+where hints is installed. Headless:
+
+    dbus-run-session -- xvfb-run -a python benchmarks/atspi_benchmark.py \
+        --depth 5 --fan-out 6 --match-ratio 0.3
+
+Use --no-collection to simulate applications that do not implement the
+Collection interface.
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from collections import Counter
+from json import dumps
+from random import Random
+from time import perf_counter, sleep
+from typing import Any
+from unittest.mock import patch
+
+from gi import require_version
+
+require_version("Atspi", "2.0")
+from gi.repository import Atspi
+
+from hints.backends.active_window import get_application_pids
+from hints.backends.atspi import AtspiBackend
+from hints.config import HintsConfig
+from hints.constants import DEFAULT_CONFIG
+from hints.window_systems.window_system import WindowSystem
+
+WINDOW_EXTENTS = (0, 0, 1920, 1080)
+PID = 4242
+APPLICATION_NAME = "benchmark"
+
+MATCHING_ROLE = Atspi.Role.PUSH_BUTTON
+NON_MATCHING_ROLE = Atspi.Role.PANEL
+MATCHING_STATES = [
+    Atspi.StateType.SENSITIVE,
+    Atspi.StateType.SHOWING,
+    Atspi.StateType.VISIBLE,
+]
+
+
+class DBusCalls:
+    """Count (and optionally delay) simulated D-Bus round trips."""
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.counter: Counter[str] = Counter()
+
+    def __call__(self, method: str):
+        self.counter[method] += 1
+        if self.latency:
+            sleep(self.latency)
+
+    def reset(self):
+        self.counter.clear()
+
+
+class Rect:
+    def __init__(self, x: int, y: int, width: int, height: int):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+class FakeStateSet:
+    def __init__(self, states: list[Atspi.StateType]):
+        self.states = set(states)
+
+    def contains(self, state: Atspi.StateType) -> bool:
+        return state in self.states
+
+    def get_states(self) -> list[Atspi.StateType]:
+        return list(self.states)
+
+
+class FakeCollection:
+    """Collection interface, matching happens "server side" in one call."""
+
+    def __init__(self, root: FakeAccessible, dbus_calls: DBusCalls):
+        self.root = root
+        self.dbus_calls = dbus_calls
+
+    def get_matches(self, _match_rule, _sort_by, _count, _traverse):
+        self.dbus_calls("Collection.GetMatches")
+        return [node for node in self.root.descendants() if node.matches]
+
+
+class FakeAccessible:
+    """Accessible element implementing what AtspiBackend uses."""
+
+    def __init__(
+        self,
+        dbus_calls: DBusCalls,
+        extents: Rect,
+        matches: bool = False,
+        collection: bool = True,
+        role: Atspi.Role | None = None,
+        states: list[Atspi.StateType] | None = None,
+        description: str = "",
+    ):
+        self.dbus_calls = dbus_calls
+        self.extents = extents
+        self.matches = matches
+        self.collection = collection
+        self.role = role or (MATCHING_ROLE if matches else NON_MATCHING_ROLE)
+        self.states = states or MATCHING_STATES
+        self.description = description
+        self.pid = PID
+        self.children: list[FakeAccessible] = []
+        self.parent: FakeAccessible | None = None
+        self.id = id(self)
+
+    @property
+    def name(self) -> str:
+        self.dbus_calls("Accessible.Name")
+        return f"node-{self.id}"
+
+    def descendants(self):
+        for child in self.children:
+            yield child
+            yield from child.descendants()
+
+    def get_id(self) -> int:
+        self.dbus_calls("Accessible.GetId")
+        return self.id
+
+    def get_role(self) -> Atspi.Role:
+        self.dbus_calls("Accessible.GetRole")
+        return self.role
+
+    def get_state_set(self) -> FakeStateSet:
+        self.dbus_calls("Accessible.GetState")
+        return FakeStateSet(self.states)
+
+    def get_extents(self, coord_type: Atspi.CoordType) -> Rect:
+        self.dbus_calls("Component.GetExtents")
+        if coord_type == Atspi.CoordType.WINDOW:
+            return Rect(
+                self.extents.x - WINDOW_EXTENTS[0],
+                self.extents.y - WINDOW_EXTENTS[1],
+                self.extents.width,
+                self.extents.height,
+            )
+        return self.extents
+
+    def get_child_count(self) -> int:
+        self.dbus_calls("Accessible.ChildCount")
+        return len(self.children)
+
+    def get_child_at_index(self, index: int) -> FakeAccessible:
+        self.dbus_calls("Accessible.GetChildAtIndex")
+        return self.children[index]
+
+    def get_collection_iface(self) -> FakeCollection | None:
+        return FakeCollection(self, self.dbus_calls) if self.collection else None
+
+    def get_description(self) -> str:
+        self.dbus_calls("Accessible.Description")
+        return self.description
+
+    def get_process_id(self) -> int:
+        self.dbus_calls("DBus.GetConnectionUnixProcessID")
+        return self.get_application().pid
+
+    def get_application(self) -> FakeAccessible:
+        node = self
+        # the application is the node right below the desktop
+        while node.parent and node.parent.parent:
+            node = node.parent
+        return node
+
+    def get_toolkit_name(self) -> str:
+        self.dbus_calls("Application.ToolkitName")
+        return "benchmark"
+
+    def get_toolkit_version(self) -> str:
+        self.dbus_calls("Application.Version")
+        return "1.0"
+
+
+def build_tree(
+    node: FakeAccessible,
+    depth: int,
+    fan_out: int,
+    match_ratio: float,
+    collection: bool,
+    rng: Random,
+):
+    """Build a tree by splitting each node's extents into a grid of
+    children.
+
+    :param node: Node to add children to.
+    :param depth: Remaining depth.
+    :param fan_out: Children per node.
+    :param match_ratio: Ratio of nodes matching the default rules.
+    :param collection: Whether nodes implement the Collection interface.
+    :param rng: Random number generator.
+    """
+    if depth == 0:
+        return
+
+    columns = max(1, round(fan_out**0.5))
+    rows = -(-fan_out // columns)
+    width = max(1, node.extents.width // columns)
+    height = max(1, node.extents.height // rows)
+
+    for index in range(fan_out):
+        child = FakeAccessible(
+            node.dbus_calls,
+            Rect(
+                node.extents.x + (index % columns) * width,
+                node.extents.y + (index // columns) * height,
+                width,
+                height,
+            ),
+            matches=rng.random() < match_ratio,
+            collection=collection,
+        )
+        child.parent = node
+        node.children.append(child)
+        build_tree(child, depth - 1, fan_out, match_ratio, collection, rng)
+
+
+def build_desktop(
+    dbus_calls: DBusCalls,
+    depth: int,
+    fan_out: int,
+    match_ratio: float,
+    collection: bool,
+    applications: int,
+    seed: int,
+) -> tuple[FakeAccessible, FakeAccessible]:
+    """Build a desktop with background applications and one focused window.
+
+    :return: The desktop and the focused window.
+    """
+    rng = Random(seed)
+    desktop = FakeAccessible(dbus_calls, Rect(*WINDOW_EXTENTS))
+
+    for index in range(max(applications, 1)):
+        application = FakeAccessible(
+            dbus_calls, Rect(*WINDOW_EXTENTS), description=f"application {index}"
+        )
+        window = FakeAccessible(
+            dbus_calls,
+            Rect(*WINDOW_EXTENTS),
+            collection=collection,
+            states=MATCHING_STATES,
+        )
+        # background applications are other processes
+        application.pid = PID + 1 + index
+        window.parent = application
+        application.children.append(window)
+        application.parent = desktop
+        desktop.children.append(application)
+
+    # the focused window is the last application, which is the worst case
+    # for looking up the active window.
+    application.pid = PID
+    window.states = MATCHING_STATES + [Atspi.StateType.ACTIVE]
+    build_tree(window, depth, fan_out, match_ratio, collection, rng)
+
+    return desktop, window
+
+
+class BenchmarkWindowSystem(WindowSystem):
+    """Window system with a fixed focused window."""
+
+    @property
+    def window_system_name(self) -> str:
+        return "benchmark"
+
+    @property
+    def focused_window_extents(self) -> tuple[int, int, int, int]:
+        return WINDOW_EXTENTS
+
+    @property
+    def focused_window_pid(self) -> int:
+        return PID
+
+    @property
+    def focused_applicaiton_name(self) -> str:
+        return APPLICATION_NAME
+
+
+def measure(name: str, func, dbus_calls: DBusCalls, repeat: int) -> dict[str, Any]:
+    """Measure a gathering function.
+
+    :param name: Name of the measurement.
+    :param func: Function returning the gathered children.
+    :param dbus_calls: D-Bus call counter.
+    :param repeat: Times to repeat the measurement.
+    :return: Measurement results.
+    """
+    timings = []
+
+    for _ in range(repeat):
+        # hints runs as a new process every time, with no pids cached
+        get_application_pids.cache_clear()
+        dbus_calls.reset()
+        start = perf_counter()
+        children = func()
+        timings.append(perf_counter() - start)
+
+    timings.sort()
+
+    return {
+        "name": name,
+        "best_ms": timings[0] * 1000,
+        "median_ms": timings[len(timings) // 2] * 1000,
+        "dbus_calls": sum(dbus_calls.counter.values()),
+        "dbus_calls_by_method": dict(dbus_calls.counter.most_common()),
+        "hints": len(children),
+    }
+
+
+def main():
+    """Benchmark entry point."""
+    parser = ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=6)
+    parser.add_argument("--match-ratio", type=float, default=0.3)
+    parser.add_argument("--no-collection", action="store_true", default=False)
+    parser.add_argument(
+        "--applications",
+        type=int,
+        default=20,
+        help="Accessible applications on the desktop.",
+    )
+    parser.add_argument(
+        "--dbus-latency-us",
+        type=float,
+        default=0,
+        help="Simulated latency for every D-Bus round trip.",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", default=False)
+    args = parser.parse_args()
+
+    dbus_calls = DBusCalls(args.dbus_latency_us / 1e6)
+    desktop, window = build_desktop(
+        dbus_calls,
+        args.depth,
+        args.fan_out,
+        args.match_ratio,
+        not args.no_collection,
+        args.applications,
+        args.seed,
+    )
+
+    config = HintsConfig(DEFAULT_CONFIG)
+    backend = AtspiBackend(config, BenchmarkWindowSystem(config))
+
+    def get_children():
+        backend.prepare()
+        return backend.get_children()
+
+    def get_children_of_interest():
+        children = []
+        backend.get_children_of_interest(window, children)
+        return children
+
+    def recursively_get_children_of_interest():
+        children = []
+        backend.recursively_get_children_of_interest(window, children)
+        return children
+
+    with patch.object(Atspi, "get_desktop", lambda _index: desktop):
+        results = [
+            # prepare also sets up the application rules used by the other
+            # measurements.
+            measure("get_children", get_children, dbus_calls, args.repeat),
+            measure(
+                "get_atspi_active_window",
+                lambda: [backend.get_atspi_active_window()],
+                dbus_calls,
+                args.repeat,
+            ),
+            measure(
+                "get_children_of_interest",
+                get_children_of_interest,
+                dbus_calls,
+                args.repeat,
+            ),
+            measure(
+                "recursively_get_children_of_interest",
+                recursively_get_children_of_interest,
+                dbus_calls,
+                args.repeat,
+            ),
+        ]
+
+    if args.json:
+        print(dumps(results, indent=2))
+        return
+
+    nodes = sum(1 for _ in window.descendants())
+    print(
+        f"tree: {nodes} nodes (depth={args.depth}, fan-out={args.fan_out},"
+        f" match-ratio={args.match_ratio},"
+        f" collection={'off' if args.no_collection else 'on'})"
+    )
+    print(f"{'':40} {'best ms':>10} {'median ms':>10} {'d-bus calls':>12} {'hints':>7}")
+    for result in results:
+        print(
+            f"{result['name']:40} {result['best_ms']:10.2f}"
+            f" {result['median_ms']:10.2f} {result['dbus_calls']:12d}"
+            f" {result['hints']:7d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Benchmark calls to the hints GNOME extension against a stand-in service.
+
+A Python stand-in for the extension (uk.co.realh.Hints, using the
+extension's introspection XML) is started on the session bus in a
+subprocess. It answers every call after --reply-delay-ms, to simulate a
+busy gnome-shell. The benchmark compares waiting for FocusedWindowInfo
+before doing other startup work with starting the call, doing the work
+(simulated with --work-ms of blocking time) and then waiting for it. Run
+it on a private session bus:
+
+    dbus-run-session -- python benchmarks/gnome_dbus_benchmark.py \
+        --reply-delay-ms 5 --work-ms 10
+"""
+
+from __future__ import annotations
+
+from argparse import SUPPRESS, ArgumentParser
+from json import dumps
+from pathlib import Path
+from statistics import median
+from subprocess import Popen
+from sys import executable
+from time import perf_counter, sleep
+from typing import Any, Callable
+
+from gi import require_version
+
+require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+
+from hints.config import HintsConfig
+from hints.constants import DEFAULT_CONFIG
+from hints.dbus import BUS_NAME, INTERFACE_NAME, OBJECT_PATH, DBusHintsProxy
+
+INTROSPECTION_FILE = (
+    Path(__file__).parent.parent
+    / "hints/extensions/gnome/hints@realh.co.uk/uk.co.realh.Hints.xml"
+)
+WINDOW_INFO = (100, 100, 1280, 720, 4242, "benchmark", 0)
+SERVICE_START_TIMEOUT = 5
+
+
+def serve(reply_delay_ms: int):
+    """Run the stand-in extension service.
+
+    :param reply_delay_ms: Delay before answering every call.
+    """
+    interface_info = Gio.DBusNodeInfo.new_for_xml(
+        INTROSPECTION_FILE.read_text(encoding="utf-8")
+    ).lookup_interface(INTERFACE_NAME)
+
+    def on_method_call(
+        _connection, _sender, _path, _interface, method_name, _parameters, invocation
+    ):
+        def reply():
+            match method_name:
+                case "FocusedWindowInfo":
+                    invocation.return_value(GLib.Variant("(iiiiisi)", WINDOW_INFO))
+                case _:
+                    invocation.return_value(None)
+
+            return GLib.SOURCE_REMOVE
+
+        GLib.timeout_add(reply_delay_ms, reply)
+
+    def on_bus_acquired(connection, _name):
+        connection.register_object(
+            OBJECT_PATH, interface_info, on_method_call, None, None
+        )
+
+    Gio.bus_own_name(
+        Gio.BusType.SESSION,
+        BUS_NAME,
+        Gio.BusNameOwnerFlags.NONE,
+        on_bus_acquired,
+        None,
+        None,
+    )
+    GLib.MainLoop().run()
+
+
+def wait_for_service():
+    """Wait until the stand-in service owns its name.
+
+    :raises TimeoutError: When the service did not start in time.
+    """
+    bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    deadline = perf_counter() + SERVICE_START_TIMEOUT
+
+    while perf_counter() < deadline:
+        (has_owner,) = bus.call_sync(
+            "org.freedesktop.DBus",
+            "/org/freedesktop/DBus",
+            "org.freedesktop.DBus",
+            "NameHasOwner",
+            GLib.Variant("(s)", (BUS_NAME,)),
+            GLib.VariantType("(b)"),
+            Gio.DBusCallFlags.NONE,
+            -1,
+            None,
+        ).unpack()
+        if has_owner:
+            return
+        sleep(0.05)
+
+    raise TimeoutError(f"{BUS_NAME} did not start.")
+
+
+def measure(name: str, run: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    """Measure a startup sequence.
+
+    :param name: Name of the measurement.
+    :param run: The sequence.
+    :param repeat: Times to run it.
+    :return: Measurement.
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        times.append(perf_counter() - start)
+
+    return {
+        "name": name,
+        "best_ms": min(times) * 1000,
+        "median_ms": median(times) * 1000,
+    }
+
+
+def main():
+    """Benchmark entry point."""
+    parser = ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--reply-delay-ms", type=int, default=5)
+    parser.add_argument(
+        "--work-ms",
+        type=float,
+        default=10,
+        help="Blocking startup work done while the call is in flight.",
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", action="store_true", default=False)
+    parser.add_argument("--serve", action="store_true", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.reply_delay_ms)
+        return
+
+    service = Popen(
+        [executable, __file__, "--serve", "--reply-delay-ms", str(args.reply_delay_ms)]
+    )
+
+    try:
+        wait_for_service()
+        proxy = DBusHintsProxy(HintsConfig(DEFAULT_CONFIG).gnome_extension_timeouts)
+        work = args.work_ms / 1000
+
+        def sequential():
+            proxy.get_focused_window_info()
+            sleep(work)
+
+        def overlapped():
+            pending_call = proxy.get_focused_window_info_async()
+            sleep(work)
+            pending_call.result()
+
+        results = [
+            measure("FocusedWindowInfo, then work", sequential, args.repeat),
+            measure("FocusedWindowInfo during work", overlapped, args.repeat),
+        ]
+    finally:
+        service.terminate()
+        service.wait()
+
+    if args.json:
+        print(dumps(results, indent=2))
+        return
+
+    print(f"reply delay: {args.reply_delay_ms} ms, work: {args.work_ms} ms")
+    print(f"{'':32} {'best ms':>10} {'median ms':>10}")
+    for result in results:
+        print(
+            f"{result['name']:32} {result['best_ms']:10.2f}"
+            f" {result['median_ms']:10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
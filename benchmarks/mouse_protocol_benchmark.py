@@ -0,0 +1,201 @@
+"""Benchmark the hints <-> hintsd binary protocol against pickle.
+
+Every request type is encoded by a client and decoded by a server
+thread, which answers with an encoded response that the client decodes,
+over a Unix socket pair using the same framing as hints and hintsd. The
+pickle path sends the dicts hints used to send before the binary
+protocol. No mouse devices are written to, so this only measures the
+protocol and the socket round trip:
+
+    python benchmarks/mouse_protocol_benchmark.py --messages 20000
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from json import dumps
+from pickle import dumps as pickle_dumps
+from pickle import loads as pickle_loads
+from socket import AF_UNIX, SOCK_STREAM, socketpair
+from statistics import median
+from threading import Thread
+from time import perf_counter
+from typing import Any, Callable
+
+from hints.mouse_protocol import (
+    FrameDecoder,
+    Opcode,
+    decode_request,
+    decode_response,
+    encode_frame,
+    encode_request,
+    encode_response,
+)
+
+RECV_SIZE = 4096
+BTN_LEFT = 0x110
+
+# requests as hints used to pickle them
+PICKLE_MESSAGES = {
+    "move": {"method": "move", "args": (960, 540), "kwargs": {"absolute": True}},
+    "click": {
+        "method": "click",
+        "args": (960, 540, BTN_LEFT, [1, 0]),
+        "kwargs": {"repeat": 1, "absolute": True},
+    },
+    "scroll": {"method": "scroll", "args": (0, -5), "kwargs": {}},
+}
+
+# opcode, fields and variable part
+BINARY_MESSAGES = {
+    "move": (Opcode.MOVE, (960, 540, True), b""),
+    "click": (Opcode.CLICK, (960, 540, BTN_LEFT, 1, True), bytes([1, 0])),
+    "scroll": (Opcode.SCROLL, (0, -5), b""),
+}
+
+
+def pickle_server(payload: bytes) -> bytes:
+    """Handle a pickled request like hintsd used to.
+
+    :param payload: The request.
+    :return: The response.
+    """
+    pickle_loads(payload)
+    return pickle_dumps(None)
+
+
+def binary_server(payload: bytes) -> bytes:
+    """Handle a binary request like hintsd does.
+
+    :param payload: The request.
+    :return: The response.
+    """
+    decode_request(payload)
+    return encode_response()
+
+
+def serve(connection, handle: Callable[[bytes], bytes]):
+    """Answer framed requests until the connection is closed.
+
+    :param connection: Server end of the socket pair.
+    :param handle: Request handler.
+    """
+    decoder = FrameDecoder()
+
+    while data := connection.recv(RECV_SIZE):
+        for request_id, payload in decoder.feed(data):
+            connection.sendall(encode_frame(request_id, handle(payload)))
+
+
+def round_trip(connection, decoder: FrameDecoder, request_id: int, payload: bytes):
+    """Send a framed request and wait for its response.
+
+    :param connection: Client end of the socket pair.
+    :param decoder: Frame decoder for the connection.
+    :param request_id: Id of the request.
+    :param payload: The request.
+    :return: The response.
+    """
+    connection.sendall(encode_frame(request_id, payload))
+
+    while True:
+        for _, response in decoder.feed(connection.recv(RECV_SIZE)):
+            return response
+
+
+def measure(
+    name: str,
+    encode: Callable[[], bytes],
+    decode: Callable[[bytes], Any],
+    handle: Callable[[bytes], bytes],
+    messages: int,
+) -> dict[str, Any]:
+    """Measure the codec and round trips for a message.
+
+    :param name: Name of the measurement.
+    :param encode: Encodes the request.
+    :param decode: Decodes the response.
+    :param handle: Server side request handler.
+    :param messages: Messages to send.
+    :return: Measurement.
+    """
+    payload = encode()
+
+    start = perf_counter()
+    for _ in range(messages):
+        handle(encode())
+    codec_us = (perf_counter() - start) / messages * 1e6
+
+    client, server = socketpair(AF_UNIX, SOCK_STREAM)
+    server_thread = Thread(target=serve, args=(server, handle), daemon=True)
+    server_thread.start()
+
+    decoder = FrameDecoder()
+    round_trips = []
+    for request_id in range(messages):
+        start = perf_counter()
+        decode(round_trip(client, decoder, request_id, encode()))
+        round_trips.append(perf_counter() - start)
+
+    client.close()
+    server_thread.join()
+    server.close()
+
+    round_trips.sort()
+    return {
+        "name": name,
+        "request_bytes": len(payload),
+        "codec_us": codec_us,
+        "median_round_trip_us": median(round_trips) * 1e6,
+        "p99_round_trip_us": round_trips[int(len(round_trips) * 0.99)] * 1e6,
+    }
+
+
+def main():
+    """Benchmark entry point."""
+    parser = ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--json", action="store_true", default=False)
+    args = parser.parse_args()
+
+    results = []
+    for message, request in PICKLE_MESSAGES.items():
+        results.append(
+            measure(
+                f"pickle {message}",
+                lambda request=request: pickle_dumps(request),
+                pickle_loads,
+                pickle_server,
+                args.messages,
+            )
+        )
+
+        opcode, fields, extra = BINARY_MESSAGES[message]
+        results.append(
+            measure(
+                f"binary {message}",
+                lambda opcode=opcode, fields=fields, extra=extra: encode_request(
+                    opcode, fields, extra
+                ),
+                decode_response,
+                binary_server,
+                args.messages,
+            )
+        )
+
+    if args.json:
+        print(dumps(results, indent=2))
+    else:
+        print(
+            f"{'message':24} {'bytes':>6} {'codec us':>9} {'rtt us':>8} {'p99 us':>8}"
+        )
+        for result in results:
+            print(
+                f"{result['name']:24} {result['request_bytes']:6d}"
+                f" {result['codec_us']:9.2f} {result['median_round_trip_us']:8.2f}"
+                f" {result['p99_round_trip_us']:8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""Benchmark and golden-image regression suite for the OpenCV backend.
+
+Screenshots from a corpus directory are fed through the OpenCV backend's
+detection pipeline (grayscale, Canny, dilate, findContours) without
+taking screenshots. For every image, per-stage timings, contour counts
+and memory peaks are reported and the detected boxes are compared
+against golden annotations.
+
+A corpus is a directory of PNG screenshots, each with a JSON file of the
+same name holding the golden boxes:
+
+    {"boxes": [[x, y, width, height], ...]}
+
+A synthetic corpus at 1080p, 1440p and 4K can be generated with:
+
+    python benchmarks/opencv_benchmark.py --generate corpus/
+
+Then run (the pipeline parameters can be overridden to tune them):
+
+    python benchmarks/opencv_benchmark.py --corpus corpus/ --kernel-size 4
+
+With --min-recall, the process exits with a non-zero status when the
+recall for any image drops below the threshold.
+"""
+
+from __future__ import annotations
+
+import sys
+from argparse import ArgumentParser
+from json import dump, dumps, load
+from pathlib import Path
+from random import Random
+from resource import RUSAGE_SELF, getrusage
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+from typing import Any
+
+from cv2 import (
+    COLOR_BGR2GRAY,
+    FILLED,
+    FONT_HERSHEY_SIMPLEX,
+    LINE_AA,
+    cvtColor,
+    imread,
+    imwrite,
+    putText,
+    rectangle,
+)
+from numpy import full, uint8
+
+from hints.backends.contour_filters import filter_rects
+from hints.backends.opencv import OpenCV
+from hints.config import HintsConfig
+from hints.constants import DEFAULT_CONFIG
+
+RESOLUTIONS = {"1080p": (1920, 1080), "1440p": (2560, 1440), "4k": (3840, 2160)}
+IOU_THRESHOLD = 0.5
+
+Box = tuple[int, int, int, int]
+
+
+def generate_corpus(corpus: Path, seed: int = 0):
+    """Generate synthetic screenshots with golden annotations.
+
+    Screenshots are made of a light background with a grid of bordered
+    "buttons" with text labels. Buttons are the golden boxes.
+
+    :param corpus: Directory to write the corpus to.
+    :param seed: Seed for the random layout.
+    """
+    corpus.mkdir(parents=True, exist_ok=True)
+    rng = Random(seed)
+
+    for name, (width, height) in RESOLUTIONS.items():
+        scale = width / 1920
+        image = full((height, width, 3), 240, uint8)
+        boxes: list[Box] = []
+
+        cell_width = int(160 * scale)
+        cell_height = int(60 * scale)
+
+        for cell_y in range(0, height - cell_height, cell_height):
+            for cell_x in range(0, width - cell_width, cell_width):
+                if rng.random() > 0.6:
+                    continue
+
+                x = cell_x + rng.randint(4, int(20 * scale))
+                y = cell_y + rng.randint(4, int(12 * scale))
+                box_width = rng.randint(cell_width // 3, cell_width - (x - cell_x) - 4)
+                box_height = rng.randint(
+                    cell_height // 3, cell_height - (y - cell_y) - 4
+                )
+                shade = rng.randint(180, 225)
+
+                rectangle(
+                    image,
+                    (x, y),
+                    (x + box_width, y + box_height),
+                    (shade, shade, shade),
+                    FILLED,
+                )
+                rectangle(
+                    image,
+                    (x, y),
+                    (x + box_width, y + box_height),
+                    (90, 90, 90),
+                    max(1, int(scale)),
+                )
+                putText(
+                    image,
+                    "Ok",
+                    (x + box_width // 4, y + (box_height * 2) // 3),
+                    FONT_HERSHEY_SIMPLEX,
+                    0.4 * scale,
+                    (20, 20, 20),
+                    1,
+                    LINE_AA,
+                )
+                boxes.append((x, y, box_width + 1, box_height + 1))
+
+        imwrite(str(corpus / f"{name}.png"), image)
+        with open(corpus / f"{name}.json", "w", encoding="utf-8") as _f:
+            dump({"boxes": boxes}, _f)
+
+
+def iou(box_a: Box, box_b: Box) -> float:
+    """Intersection over union of two boxes.
+
+    :param box_a: Box (x, y, width, height).
+    :param box_b: Box (x, y, width, height).
+    :return: Intersection over union.
+    """
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    intersection_width = min(ax + aw, bx + bw) - max(ax, bx)
+    intersection_height = min(ay + ah, by + bh) - max(ay, by)
+
+    if intersection_width <= 0 or intersection_height <= 0:
+        return 0
+
+    intersection = intersection_width * intersection_height
+    return intersection / (aw * ah + bw * bh - intersection)
+
+
+def compare_boxes(detected: list[Box], golden: list[Box]) -> dict[str, float]:
+    """Greedily match detected boxes to golden boxes.
+
+    :param detected: Detected boxes.
+    :param golden: Golden boxes.
+    :return: Precision and recall.
+    """
+    unmatched = list(detected)
+    matched = 0
+
+    for golden_box in golden:
+        best_index, best_iou = -1, IOU_THRESHOLD
+        for index, detected_box in enumerate(unmatched):
+            overlap = iou(golden_box, detected_box)
+            if overlap >= best_iou:
+                best_index, best_iou = index, overlap
+
+        if best_index >= 0:
+            unmatched.pop(best_index)
+            matched += 1
+
+    return {
+        "precision": matched / len(detected) if detected else 0,
+        "recall": matched / len(golden) if golden else 1,
+    }
+
+
+def run_pipeline(
+    backend: OpenCV, image, application_rules: dict[str, Any]
+) -> tuple[list[Box], dict[str, float]]:
+    """Run the OpenCV backend pipeline timing every stage.
+
+    :param backend: OpenCV backend.
+    :param image: Screenshot as an array.
+    :param application_rules: Application rules for the pipeline.
+    :return: Detected boxes and stage timings in milliseconds.
+    """
+    timings = {}
+
+    start_time = perf_counter()
+    # capture engines convert to grayscale as part of capturing
+    gray_image = cvtColor(image, COLOR_BGR2GRAY)
+    timings["grayscale"] = perf_counter() - start_time
+
+    if application_rules["detection_scale"] < 1 or application_rules["tiles"] > 1:
+        # downscaled and tiled detection don't run the stages one by one
+        start_time = perf_counter()
+        boxes = backend.get_bounding_rects(gray_image, application_rules)
+        timings["detect"] = perf_counter() - start_time
+        timings["total"] = sum(timings.values())
+
+        return boxes, {stage: timing * 1000 for stage, timing in timings.items()}
+
+    start_time = perf_counter()
+    edges = backend.detect_edges(gray_image, application_rules)
+    timings["canny"] = perf_counter() - start_time
+
+    start_time = perf_counter()
+    dilated_edges = backend.dilate_edges(edges, application_rules)
+    timings["dilate"] = perf_counter() - start_time
+
+    start_time = perf_counter()
+    rects = backend.find_bounding_rects(
+        dilated_edges, application_rules["contour_retrieval"]
+    )
+    timings["contours"] = perf_counter() - start_time
+
+    start_time = perf_counter()
+    boxes = [
+        tuple(rect)
+        for rect in filter_rects(
+            rects, image.shape[0] * image.shape[1], application_rules
+        ).tolist()
+    ]
+    timings["filter"] = perf_counter() - start_time
+
+    timings["total"] = sum(timings.values())
+
+    return boxes, {stage: timing * 1000 for stage, timing in timings.items()}
+
+
+def benchmark_image(
+    backend: OpenCV,
+    screenshot: Path,
+    application_rules: dict[str, Any],
+    repeat: int,
+) -> dict[str, Any]:
+    """Benchmark a single screenshot.
+
+    :param backend: OpenCV backend.
+    :param screenshot: Path to the screenshot.
+    :param application_rules: Application rules for the pipeline.
+    :param repeat: Times to run the pipeline.
+    :return: Benchmark results.
+    """
+    image = imread(str(screenshot))
+    runs = []
+
+    start()
+    reset_peak()
+    for _ in range(repeat):
+        runs.append(run_pipeline(backend, image, application_rules))
+    _, memory_peak = get_traced_memory()
+    stop()
+
+    boxes = runs[0][0]
+    stage_timings = {
+        stage: sorted(timings[stage] for _, timings in runs)[len(runs) // 2]
+        for stage in runs[0][1]
+    }
+
+    result = {
+        "image": screenshot.name,
+        "resolution": f"{image.shape[1]}x{image.shape[0]}",
+        "median_stage_ms": stage_timings,
+        "contours": len(boxes),
+        "memory_peak_mib": memory_peak / 2**20,
+    }
+
+    golden_file = screenshot.with_suffix(".json")
+    if golden_file.exists():
+        with open(golden_file, encoding="utf-8") as _f:
+            golden = [tuple(box) for box in load(_f)["boxes"]]
+        result["golden_boxes"] = len(golden)
+        result.update(compare_boxes(boxes, golden))
+
+    return result
+
+
+def main():
+    """Benchmark entry point."""
+    parser = ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--corpus", type=Path, help="Corpus directory to run.")
+    parser.add_argument(
+        "--generate", type=Path, help="Generate a synthetic corpus in this directory."
+    )
+    parser.add_argument("--canny-min-val", type=int)
+    parser.add_argument("--canny-max-val", type=int)
+    parser.add_argument("--kernel-size", type=int)
+    parser.add_argument("--detection-scale", type=float)
+    parser.add_argument("--tiles", type=int)
+    parser.add_argument(
+        "--contour-retrieval", choices=["list", "external", "leaf"], type=str
+    )
+    parser.add_argument("--min-area", type=float)
+    parser.add_argument("--max-area-ratio", type=float)
+    parser.add_argument("--min-aspect-ratio", type=float)
+    parser.add_argument("--max-aspect-ratio", type=float)
+    parser.add_argument("--max-contained", type=int)
+    parser.add_argument("--nms-threshold", type=float)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0)
+    parser.add_argument("--json", action="store_true", default=False)
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_corpus(args.generate)
+        if not args.corpus:
+            return
+
+    if not args.corpus:
+        parser.error("one of --corpus or --generate is required")
+
+    rule_overrides = {}
+    for rule in (
+        "canny_min_val",
+        "canny_max_val",
+        "kernel_size",
+        "detection_scale",
+        "tiles",
+        "contour_retrieval",
+        "min_area",
+        "max_area_ratio",
+        "min_aspect_ratio",
+        "max_aspect_ratio",
+        "max_contained",
+        "nms_threshold",
+    ):
+        if getattr(args, rule) is not None:
+            rule_overrides[rule] = getattr(args, rule)
+
+    config = HintsConfig(
+        DEFAULT_CONFIG,
+        {"backends": {"opencv": {"application_rules": {"default": rule_overrides}}}},
+    )
+    application_rules = config.backends.opencv.application_rules.get("default")
+    backend = OpenCV(config, None)
+    results = [
+        benchmark_image(backend, screenshot, application_rules, args.repeat)
+        for screenshot in sorted(args.corpus.glob("*.png"))
+    ]
+
+    if args.json:
+        print(dumps(results, indent=2))
+    else:
+        print(f"rules: {application_rules}")
+        print(
+            f"{'image':16} {'size':>10} {'gray':>7} {'canny':>7} {'dilate':>7}"
+            f" {'contour':>7} {'filter':>7} {'total':>7} {'boxes':>6} {'MiB':>6}"
+            f" {'prec':>5} {'recall':>6}"
+        )
+        for result in results:
+            stages = result["median_stage_ms"]
+            print(
+                f"{result['image']:16} {result['resolution']:>10}"
+                f" {stages['grayscale']:7.2f} {stages.get('canny', 0):7.2f}"
+                f" {stages.get('dilate', 0):7.2f} {stages.get('contours', 0):7.2f}"
+                f" {stages.get('filter', 0):7.2f}"
+                f" {stages['total']:7.2f} {result['contours']:6d}"
+                f" {result['memory_peak_mib']:6.1f}"
+                f" {result.get('precision', 0):5.2f} {result.get('recall', 0):6.2f}"
+            )
+        print(f"max rss: {getrusage(RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+    if any(result.get("recall", 1) < args.min_recall for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Focused window lookup for the Atspi backend.
+
+Every call on an Atspi application or window is a D-Bus round trip, and
+the desktop can hold dozens of applications. Instead of checking every
+window of every application, applications are filtered by the focused
+window's pid first. Application pids are cached for as long as the
+application stays on the desktop (libatspi keeps one Accessible per
+application), so each application's pid is only looked up once per
+process.
+"""
+
+from __future__ import annotations
+
+from functools import cache
+
+from gi import require_version
+
+require_version("Atspi", "2.0")
+from gi.repository import Atspi
+
+
+class ApplicationPids:
+    """Cached process IDs of the applications on the Atspi desktop."""
+
+    def __init__(self):
+        """Application pids constructor."""
+        self.pids: dict[Atspi.Accessible, int] = {}
+
+    def update(self, applications: list[Atspi.Accessible]):
+        """Drop the pids of applications that left the desktop.
+
+        :param applications: Applications on the desktop.
+        """
+        self.pids = {
+            application: self.pids[application]
+            for application in applications
+            if application in self.pids
+        }
+
+    def get(self, application: Atspi.Accessible) -> int:
+        """Get the process ID of an application.
+
+        :param application: The application.
+        :return: Process ID.
+        """
+        if (pid := self.pids.get(application)) is None:
+            pid = self.pids[application] = application.get_process_id()
+
+        return pid
+
+
+@cache
+def get_application_pids() -> ApplicationPids:
+    """Get the application pid cache of the process.
+
+    :return: Application pids.
+    """
+    return ApplicationPids()
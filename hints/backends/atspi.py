@@ -10,8 +10,10 @@ from hints.window_systems.window_system_type import WindowSystemType
 require_version("Atspi", "2.0")
 from gi.repository import Atspi
 
+from hints.backends.active_window import get_application_pids
 from hints.backends.backend import HintsBackend
 from hints.backends.exceptions import AccessibleChildrenNotFoundError
+from hints.backends.scale_factor import get_scale_factor_detector
 from hints.child import Child
 
 logger = logging.getLogger(__name__)
@@ -32,6 +34,7 @@ class AtspiBackend(HintsBackend):
         self.toolkit = ""
         self.toolkit_version = ""
         self.scale_factor = 1
+        self.window: Atspi.Accessible | None = None
 
     def get_relative_and_absolute_extents(
         self, root: Atspi.Accessible
@@ -166,6 +169,7 @@ class AtspiBackend(HintsBackend):
         :param children: Set of coordinates for children to use to store
             found children coordinates.
         """
+        self.check_cancelled()
 
         absolute_position, relative_position, size = (
             self.get_relative_and_absolute_extents(root)
@@ -245,6 +249,7 @@ class AtspiBackend(HintsBackend):
             )
 
             for match in matches:
+                self.check_cancelled()
 
                 absolute_position, relative_position, size = (
                     self.get_relative_and_absolute_extents(match)
@@ -285,40 +290,68 @@ class AtspiBackend(HintsBackend):
     def get_atspi_active_window(self) -> Atspi.Accessible | None:
         """Get the current accessible window in focus with Atspi.
 
+        Only the windows of applications with the focused window's pid
+        are checked.
+
         :return: Atspi focused window / accessible root element.
         """
         desktop = Atspi.get_desktop(0)
-        for app_index in range(desktop.get_child_count()):
-            window = desktop.get_child_at_index(app_index)
+        applications = [
+            desktop.get_child_at_index(app_index)
+            for app_index in range(desktop.get_child_count())
+        ]
+        # the focused window's pid is only needed from here, so window
+        # systems can look it up while the desktop is listed.
+        focused_window_pid = self.window_system.focused_window_pid
+
+        application_pids = get_application_pids()
+        application_pids.update(applications)
+
+        for application in applications:
+            self.check_cancelled()
+            # Some hidden windows that are minimized to status trays
+            # (like discord) will still have the Atspi.StateType.Active
+            # state, so the pid from the window manger allows us to filter
+            # out such applications.
+            if application_pids.get(application) != focused_window_pid:
+                continue
             # Gnome creates a mutter application that is also focused.
             # This is not what we want, so we are skipping it.
-            if "mutter-x11-frames" in window.get_description():
+            if "mutter-x11-frames" in application.get_description():
                 continue
-            for window_index in range(window.get_child_count()):
-                current_window = window.get_child_at_index(window_index)
-                # Some hidden windows that are minimized to status trays
-                # (like discord) will still have the Atspi.StateType.Active
-                # state, so the pid from the window manger allows us to filter
-                # out such applications.
-                if (
-                    current_window.get_state_set().contains(Atspi.StateType.ACTIVE)
-                    and current_window.get_process_id()
-                    == self.window_system.focused_window_pid
-                ):
+            for window_index in range(application.get_child_count()):
+                current_window = application.get_child_at_index(window_index)
+                if current_window.get_state_set().contains(Atspi.StateType.ACTIVE):
                     return current_window
 
         return None
 
-    def get_children(
-        self,
-    ) -> list[Child]:
-        """Get coordinates of children.
+    def detect_scale_factor(self, window: Atspi.Accessible) -> float:
+        """Detect the scale factor for a window.
 
-        :return: The extents of the window containing the children and
-            centered children coordinates.
+        :param window: Atspi window.
+        :return: The scale factor.
         """
-        children: list[Child] = []
-        window = self.get_atspi_active_window()
+
+        def get_atspi_window_size() -> tuple[int, int]:
+            extents = window.get_extents(Atspi.CoordType.WINDOW)
+            return extents.width, extents.height
+
+        return get_scale_factor_detector().get_scale_factor(
+            self.window_system.focused_applicaiton_name,
+            self.window_system.focused_window_extents,
+            get_atspi_window_size,
+        )
+
+    def prepare(self):
+        """Find the active window and read its application rules and scale
+        factor.
+
+        Detecting the scale factor reads the monitor layout from Gdk, so
+        it is done here rather than in get_children.
+        """
+        super().prepare()
+        self.window = window = self.get_atspi_active_window()
 
         if window:
             application = window.get_application()
@@ -336,6 +369,23 @@ class AtspiBackend(HintsBackend):
             self.roles_match_type = application_rules["roles_match_type"]
             self.scale_factor = application_rules["scale_factor"]
 
+            if self.scale_factor == "auto":
+                self.scale_factor = self.detect_scale_factor(window)
+
+    def get_children(
+        self,
+    ) -> list[Child]:
+        """Get coordinates of children.
+
+        :return: The extents of the window containing the children and
+            centered children coordinates.
+        """
+        children: list[Child] = []
+
+        if not self.prepared:
+            self.prepare()
+
+        if window := self.window:
             self.get_children_of_interest(
                 window,
                 children,
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from threading import Event
 from typing import TYPE_CHECKING, Any
 
+from hints.backends.exceptions import BackendCancelledError
 from hints.utils import HintsConfig
 
 if TYPE_CHECKING:
@@ -20,20 +22,49 @@ class HintsBackend:
         self.backend_name = ""
         self.config = config
         self.window_system = window_system
+        self.cancelled = Event()
+        self.prepared = False
+
+    def prepare(self):
+        """Read what the backend needs from the window system and
+        monitors.
+
+        get_children can run in a worker thread, and neither the window
+        systems nor Gdk are thread safe, so strategies call this on the
+        main thread first. Backends reading more than the focused window
+        extend it.
+        """
+        self.window_system.resolve()
+        self.prepared = True
+
+    def cancel(self):
+        """Cancel gathering children.
+
+        Backends stop at the next call to check_cancelled, which makes
+        get_children raise BackendCancelledError.
+        """
+        self.cancelled.set()
+
+    def check_cancelled(self):
+        """Stop gathering children if the backend was cancelled.
+
+        :raises BackendCancelledError: If the backend was cancelled.
+        """
+        if self.cancelled.is_set():
+            raise BackendCancelledError()
 
     def get_application_rules(self) -> dict[str, Any]:
         """Get the application rules from the config file.
 
         This uses the "default" application rule and overwrites any
-        rules specific to an application by the application name.
+        rules specific to an application by the application name. The
+        rules are shared and must not be modified.
 
         :return: The application rules
         """
-        application_rules = self.config["backends"][self.backend_name][
-            "application_rules"
-        ]
-        return application_rules["default"] | application_rules.get(
-            self.window_system.focused_applicaiton_name, {}
+        backend_config = getattr(self.config.backends, self.backend_name)
+        return backend_config.application_rules.get(
+            self.window_system.focused_applicaiton_name
         )
 
     def get_children(self) -> list[Child]:
@@ -0,0 +1,141 @@
+"""Filters for the bounding rectangles found by the OpenCV backend.
+
+Rectangles are (N, 4) arrays of (x, y, width, height) and every filter
+is vectorized with NumPy.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from numpy import argsort, maximum, minimum, ndarray, ones
+
+
+def filter_by_size(
+    rects: ndarray,
+    image_area: int,
+    min_area: float,
+    max_area_ratio: float,
+    min_aspect_ratio: float,
+    max_aspect_ratio: float,
+) -> ndarray:
+    """Filter rectangles by area and aspect ratio.
+
+    :param rects: Rectangles.
+    :param image_area: Area of the image the rectangles were found in.
+    :param min_area: Minimum area in pixels.
+    :param max_area_ratio: Maximum area as a ratio of the image area.
+    :param min_aspect_ratio: Minimum width / height (0 to disable).
+    :param max_aspect_ratio: Maximum width / height (0 to disable).
+    :return: Filtered rectangles.
+    """
+    widths = rects[:, 2]
+    heights = rects[:, 3]
+    areas = widths * heights
+    keep = (areas >= min_area) & (areas <= max_area_ratio * image_area)
+
+    aspect_ratios = widths / maximum(heights, 1)
+    if min_aspect_ratio:
+        keep &= aspect_ratios >= min_aspect_ratio
+    if max_aspect_ratio:
+        keep &= aspect_ratios <= max_aspect_ratio
+
+    return rects[keep]
+
+
+def filter_containers(rects: ndarray, max_contained: int) -> ndarray:
+    """Drop rectangles that contain more than max_contained rectangles.
+
+    These are usually panels or the window itself rather than something
+    to interact with.
+
+    :param rects: Rectangles.
+    :param max_contained: Maximum number of rectangles a rectangle can
+        contain.
+    :return: Filtered rectangles.
+    """
+    x1 = rects[:, 0]
+    y1 = rects[:, 1]
+    x2 = x1 + rects[:, 2]
+    y2 = y1 + rects[:, 3]
+
+    # contains[i, j] is True if rect i contains rect j
+    contains = (
+        (x1[:, None] <= x1[None, :])
+        & (y1[:, None] <= y1[None, :])
+        & (x2[:, None] >= x2[None, :])
+        & (y2[:, None] >= y2[None, :])
+    )
+    # rects contain themselves
+    contained_count = contains.sum(axis=1) - 1
+
+    return rects[contained_count <= max_contained]
+
+
+def non_maximum_suppression(rects: ndarray, iou_threshold: float) -> ndarray:
+    """Drop rectangles overlapping a larger rectangle by more than
+    iou_threshold.
+
+    :param rects: Rectangles.
+    :param iou_threshold: Intersection over union threshold.
+    :return: Filtered rectangles.
+    """
+    x1 = rects[:, 0]
+    y1 = rects[:, 1]
+    x2 = x1 + rects[:, 2]
+    y2 = y1 + rects[:, 3]
+    areas = rects[:, 2] * rects[:, 3]
+
+    order = argsort(areas)[::-1]
+    keep = ones(len(rects), dtype=bool)
+
+    for position, index in enumerate(order):
+        if not keep[index]:
+            continue
+
+        others = order[position + 1 :]
+        others = others[keep[others]]
+
+        intersection_width = maximum(
+            minimum(x2[index], x2[others]) - maximum(x1[index], x1[others]), 0
+        )
+        intersection_height = maximum(
+            minimum(y2[index], y2[others]) - maximum(y1[index], y1[others]), 0
+        )
+        intersection = intersection_width * intersection_height
+        iou = intersection / maximum(areas[index] + areas[others] - intersection, 1)
+
+        keep[others[iou > iou_threshold]] = False
+
+    return rects[keep]
+
+
+def filter_rects(
+    rects: ndarray, image_area: int, application_rules: dict[str, Any]
+) -> ndarray:
+    """Apply the filters enabled in the application rules.
+
+    :param rects: Rectangles.
+    :param image_area: Area of the image the rectangles were found in.
+    :param application_rules: Application rules for the window.
+    :return: Filtered rectangles.
+    """
+    if not len(rects):
+        return rects
+
+    rects = filter_by_size(
+        rects,
+        image_area,
+        application_rules["min_area"],
+        application_rules["max_area_ratio"],
+        application_rules["min_aspect_ratio"],
+        application_rules["max_aspect_ratio"],
+    )
+
+    if application_rules["max_contained"]:
+        rects = filter_containers(rects, application_rules["max_contained"])
+
+    if application_rules["nms_threshold"]:
+        rects = non_maximum_suppression(rects, application_rules["nms_threshold"])
+
+    return rects
@@ -0,0 +1,98 @@
+"""Cache of the last capture and detected elements for the OpenCV backend.
+
+hints runs as a new process every time it is invoked, so the cache lives
+in $XDG_RUNTIME_DIR (a tmpfs, so reading it back is a memory copy). It
+is keyed per window, and stores the grayscale capture along with the
+unfiltered bounding rects detected in it so a new capture can be diffed
+against it and only the parts of the window that changed reprocessed.
+"""
+
+from __future__ import annotations
+
+import logging
+from hashlib import sha1
+
+from numpy import load, ndarray, pad, savez
+
+from hints.constants import CACHE_DIRECTORY
+from hints.utils import get_cache_directory
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_WINDOWS = 8
+
+
+class DetectionCache:
+    """Last capture and detected rects for a window."""
+
+    def __init__(self, window_key: str, rules_key: str):
+        """Detection cache constructor.
+
+        :param window_key: Key identifying the window (ex: application
+            name and extents).
+        :param rules_key: Key identifying the detection rules, cached
+            results are not reused when they change.
+        """
+        self.rules_key = rules_key
+        self.path = (
+            CACHE_DIRECTORY / f"opencv-{sha1(window_key.encode()).hexdigest()}.npz"
+        )
+
+    def load(self) -> tuple[ndarray, ndarray] | None:
+        """Load the last capture and rects for the window.
+
+        :return: The grayscale capture and rects, or None if there is no
+            usable cache.
+        """
+        try:
+            get_cache_directory()
+            with load(self.path) as cache:
+                if str(cache["rules_key"]) != self.rules_key:
+                    return None
+                return cache["gray_image"], cache["rects"]
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, gray_image: ndarray, rects: ndarray):
+        """Save the capture and rects for the window.
+
+        :param gray_image: Grayscale capture.
+        :param rects: Unfiltered rects detected in the capture.
+        """
+        try:
+            get_cache_directory()
+
+            # uncompressed, compressing costs more than it saves on tmpfs
+            with open(self.path, "wb") as _f:
+                savez(_f, gray_image=gray_image, rects=rects, rules_key=self.rules_key)
+
+            cached_windows = sorted(
+                CACHE_DIRECTORY.glob("opencv-*.npz"),
+                key=lambda path: path.stat().st_mtime,
+            )
+            for path in cached_windows[:-MAX_CACHED_WINDOWS]:
+                path.unlink(missing_ok=True)
+        except OSError as error:
+            logger.debug("Could not save the detection cache: %s", error)
+
+
+def get_changed_tiles(
+    previous_image: ndarray, gray_image: ndarray, tile_size: int
+) -> ndarray:
+    """Get the tiles that changed between two captures.
+
+    :param previous_image: Previous grayscale capture.
+    :param gray_image: Current grayscale capture (same shape).
+    :param tile_size: Size of the (square) tiles in pixels.
+    :return: 2D boolean array, True for tiles that changed.
+    """
+    changed = previous_image != gray_image
+    height, width = changed.shape
+    changed = pad(changed, ((0, -height % tile_size), (0, -width % tile_size)))
+
+    return changed.reshape(
+        changed.shape[0] // tile_size,
+        tile_size,
+        changed.shape[1] // tile_size,
+        tile_size,
+    ).any(axis=(1, 3))
@@ -10,3 +10,18 @@ class AccessibleChildrenNotFoundError(Exception):
 class CouldNotFindAccessibleWindow(Exception):
     def __str__(self):
         return "The current window is not accessible."
+
+
+class BackendCancelledError(Exception):
+    def __str__(self):
+        return "The backend was cancelled."
+
+
+class CaptureEngineUnavailable(Exception):
+    def __init__(self, engine: str, reason: str):
+        super().__init__(engine, reason)
+        self.engine = engine
+        self.reason = reason
+
+    def __str__(self):
+        return f"The '{self.engine}' capture engine is unavailable: {self.reason}"
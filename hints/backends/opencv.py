@@ -1,19 +1,38 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+from typing import TYPE_CHECKING, Any
 
-import pyscreenshot as ImageGrab
-from cv2 import (CHAIN_APPROX_SIMPLE, COLOR_BGR2GRAY, RETR_LIST, Canny,
-                 boundingRect, cvtColor, dilate, findContours)
-from numpy import array, ones, uint8
+from cv2 import (
+    CHAIN_APPROX_SIMPLE,
+    INTER_AREA,
+    RETR_EXTERNAL,
+    RETR_LIST,
+    RETR_TREE,
+    Canny,
+    boundingRect,
+    dilate,
+    findContours,
+    resize,
+)
+from numpy import array
+from numpy import ceil as npceil
+from numpy import empty_like, ones, rint, uint8, vstack
 
 from hints.backends.backend import HintsBackend
-from hints.backends.exceptions import AccessibleChildrenNotFoundError
+from hints.backends.contour_filters import filter_rects
+from hints.backends.detection_cache import DetectionCache, get_changed_tiles
+from hints.backends.exceptions import (
+    AccessibleChildrenNotFoundError,
+    CaptureEngineUnavailable,
+)
+from hints.backends.screen_capture import PyscreenshotCapture, get_screen_capture
 from hints.child import Child
 
 if TYPE_CHECKING:
-    from PIL.Image import Image
+    from numpy import ndarray
 
 logger = logging.getLogger(__name__)
 
@@ -29,24 +48,300 @@ class OpenCV(HintsBackend):
         self,
         window_extents: tuple[int, int, int, int],
         window_extents_offsets: tuple[int, int, int, int] = (0, 0, 0, 0),
-    ) -> Image:
-        """Take a screenshot of a window specified by its extents.
+    ) -> ndarray:
+        """Take a grayscale screenshot of a window specified by its extents.
 
         :param window_extents: The extents of a window to screenshot
             (x,y,width,height).
         :param window_extents_offsets: Any offsets for the screenshot
             area (window) (x,y,width,height).
-        :return: Screeshot image.
+        :return: Grayscale screeshot image.
         """
         x, y, w, h = window_extents
-        return ImageGrab.grab(
-            (
-                x + window_extents_offsets[0],
-                y + window_extents_offsets[1],
-                x + w + window_extents_offsets[2],
-                y + h + window_extents_offsets[3],
+        left = x + window_extents_offsets[0]
+        top = y + window_extents_offsets[1]
+        width = x + w + window_extents_offsets[2] - left
+        height = y + h + window_extents_offsets[3] - top
+
+        screen_capture = get_screen_capture(
+            self.config.backends.opencv.capture_engine, self.window_system
+        )
+
+        try:
+            return screen_capture.capture(left, top, width, height)
+        except CaptureEngineUnavailable as error:
+            logger.debug("%s, falling back to pyscreenshot.", error)
+            return PyscreenshotCapture().capture(left, top, width, height)
+
+    def detect_edges(
+        self, gray_image: ndarray, application_rules: dict[str, Any]
+    ) -> ndarray:
+        """Detect edges in a grayscale image.
+
+        :param gray_image: Grayscale image.
+        :param application_rules: Application rules for the window.
+        :return: Edges.
+        """
+        return Canny(
+            gray_image,
+            application_rules["canny_min_val"],
+            application_rules["canny_max_val"],
+        )
+
+    def dilate_edges(
+        self, edges: ndarray, application_rules: dict[str, Any]
+    ) -> ndarray:
+        """Dilate edges so that edges of the same element are connected.
+
+        :param edges: Edges.
+        :param application_rules: Application rules for the window.
+        :return: Dilated edges.
+        """
+        kernel = ones(
+            (application_rules["kernel_size"], application_rules["kernel_size"]), uint8
+        )
+
+        return dilate(edges, kernel)
+
+    def get_dilated_edges(
+        self, gray_image: ndarray, application_rules: dict[str, Any]
+    ) -> ndarray:
+        """Detect and dilate edges, optionally in horizontal bands.
+
+        With more than one tile, the image is split into horizontal bands
+        that are processed across a thread pool (OpenCV releases the GIL).
+        Bands are padded with rows from their neighbours so that edges
+        and dilation near band borders match the untiled result, and
+        each band writes back its own rows, so contours crossing borders
+        come out whole when contours are found on the stitched result.
+
+        :param gray_image: Grayscale image.
+        :param application_rules: Application rules for the window.
+        :return: Dilated edges.
+        """
+        tiles = application_rules["tiles"]
+
+        if tiles <= 1:
+            return self.dilate_edges(
+                self.detect_edges(gray_image, application_rules), application_rules
+            )
+
+        height = gray_image.shape[0]
+        band_height = ceil(height / tiles)
+        # Canny uses a 3x3 aperture on top of the dilation kernel
+        padding = application_rules["kernel_size"] + 3
+        dilated_edges = empty_like(gray_image)
+
+        def process_band(top: int):
+            bottom = min(top + band_height, height)
+            padded_top = max(top - padding, 0)
+            padded_bottom = min(bottom + padding, height)
+
+            band = self.dilate_edges(
+                self.detect_edges(
+                    gray_image[padded_top:padded_bottom], application_rules
+                ),
+                application_rules,
+            )
+            dilated_edges[top:bottom] = band[top - padded_top : bottom - padded_top]
+
+        with ThreadPoolExecutor(max_workers=tiles) as executor:
+            list(executor.map(process_band, range(0, height, band_height)))
+
+        return dilated_edges
+
+    def find_bounding_rects(
+        self, dilated_edges: ndarray, contour_retrieval: str = "list"
+    ) -> ndarray:
+        """Find the bounding rectangles of contours.
+
+        :param dilated_edges: Dilated edges.
+        :param contour_retrieval: "list" for every contour, "external" for
+            outermost contours only, or "leaf" for contours that do not
+            contain other contours.
+        :return: Bounding rectangles (x, y, width, height) as an (N, 4)
+            array.
+        """
+        mode = {"list": RETR_LIST, "external": RETR_EXTERNAL, "leaf": RETR_TREE}[
+            contour_retrieval
+        ]
+        contours, hierarchy = findContours(dilated_edges, mode, CHAIN_APPROX_SIMPLE)
+
+        if contour_retrieval == "leaf" and contours:
+            # hierarchy rows are (next, previous, first_child, parent)
+            contours = [
+                contour
+                for contour, (_, _, first_child, _) in zip(contours, hierarchy[0])
+                if first_child == -1
+            ]
+
+        return array([boundingRect(contour) for contour in contours]).reshape(-1, 4)
+
+    def detect_rects(
+        self, gray_image: ndarray, application_rules: dict[str, Any]
+    ) -> ndarray:
+        """Detect the bounding rectangles of elements in a grayscale image.
+
+        :param gray_image: Grayscale image.
+        :param application_rules: Application rules for the window.
+        :return: Unfiltered bounding rectangles (x, y, width, height) as
+            an (N, 4) array.
+        """
+        scale = application_rules["detection_scale"]
+        contour_retrieval = application_rules["contour_retrieval"]
+
+        if scale >= 1:
+            return self.find_bounding_rects(
+                self.get_dilated_edges(gray_image, application_rules),
+                contour_retrieval,
             )
+
+        # detect on a downscaled image, the kernel is scaled with it so that
+        # elements are connected the same way they are at full resolution.
+        scaled_rules = application_rules | {
+            "kernel_size": max(1, round(application_rules["kernel_size"] * scale))
+        }
+        scaled_image = resize(
+            gray_image, None, fx=scale, fy=scale, interpolation=INTER_AREA
+        )
+        rects = self.find_bounding_rects(
+            self.get_dilated_edges(scaled_image, scaled_rules),
+            contour_retrieval,
         )
+        rects[:, :2] = rint(rects[:, :2] / scale)
+        rects[:, 2:] = npceil(rects[:, 2:] / scale)
+
+        return rects
+
+    def detect_rects_incrementally(
+        self,
+        gray_image: ndarray,
+        application_rules: dict[str, Any],
+        window_key: str,
+    ) -> ndarray:
+        """Detect bounding rectangles reusing the last detection for the
+        window.
+
+        The capture is diffed against the previous capture of the window
+        in tiles. Only the area covering changed tiles (and the cached
+        elements overlapping them) is processed again, and its elements
+        replace the cached elements in that area.
+
+        :param gray_image: Grayscale image.
+        :param application_rules: Application rules for the window.
+        :param window_key: Key identifying the window.
+        :return: Unfiltered bounding rectangles (x, y, width, height) as
+            an (N, 4) array.
+        """
+        cache = DetectionCache(window_key, repr(sorted(application_rules.items())))
+        cached = cache.load()
+        rects = None
+
+        if cached and cached[0].shape == gray_image.shape:
+            previous_image, previous_rects = cached
+            tile_size = application_rules["incremental_tile_size"]
+            changed_tiles = get_changed_tiles(previous_image, gray_image, tile_size)
+
+            if not changed_tiles.any():
+                logger.debug("Window unchanged, reusing cached elements.")
+                rects = previous_rects
+
+            elif changed_tiles.mean() <= application_rules["incremental_max_changed"]:
+                rows, columns = changed_tiles.nonzero()
+                left = columns.min() * tile_size
+                top = rows.min() * tile_size
+                right = (columns.max() + 1) * tile_size
+                bottom = (rows.max() + 1) * tile_size
+
+                x1 = previous_rects[:, 0]
+                y1 = previous_rects[:, 1]
+                x2 = x1 + previous_rects[:, 2]
+                y2 = y1 + previous_rects[:, 3]
+
+                # grow the area so stale elements are detected whole again.
+                # Growing it can overlap more cached elements, which are
+                # detected again too, so it is grown until it covers every
+                # element it overlaps (otherwise they would be duplicated).
+                while True:
+                    stale = (x1 < right) & (x2 > left) & (y1 < bottom) & (y2 > top)
+                    if not stale.any():
+                        break
+
+                    area = (left, top, right, bottom)
+                    left = min(left, x1[stale].min())
+                    top = min(top, y1[stale].min())
+                    right = max(right, x2[stale].max())
+                    bottom = max(bottom, y2[stale].max())
+                    if (left, top, right, bottom) == area:
+                        break
+
+                # plus a margin so edges near the border match a full pass.
+                margin = application_rules["kernel_size"] + 3
+
+                roi_left = max(left - margin, 0)
+                roi_top = max(top - margin, 0)
+                roi_rects = self.detect_rects(
+                    gray_image[roi_top : bottom + margin, roi_left : right + margin],
+                    application_rules,
+                )
+                roi_rects[:, 0] += roi_left
+                roi_rects[:, 1] += roi_top
+
+                # elements found only in the margin are already cached
+                in_area = (
+                    (roi_rects[:, 0] < right)
+                    & (roi_rects[:, 0] + roi_rects[:, 2] > left)
+                    & (roi_rects[:, 1] < bottom)
+                    & (roi_rects[:, 1] + roi_rects[:, 3] > top)
+                )
+
+                logger.debug(
+                    "Reprocessed %d/%d changed tiles, area (%d, %d, %d, %d).",
+                    changed_tiles.sum(),
+                    changed_tiles.size,
+                    left,
+                    top,
+                    right,
+                    bottom,
+                )
+                rects = vstack((previous_rects[~stale], roi_rects[in_area]))
+
+        if rects is None:
+            rects = self.detect_rects(gray_image, application_rules)
+
+        cache.save(gray_image, rects)
+
+        return rects
+
+    def get_bounding_rects(
+        self,
+        gray_image: ndarray,
+        application_rules: dict[str, Any],
+        window_key: str = "",
+    ) -> list[tuple[int, int, int, int]]:
+        """Run the detection pipeline on a grayscale screenshot.
+
+        :param gray_image: Grayscale screenshot.
+        :param application_rules: Application rules for the window.
+        :param window_key: Key identifying the window, used for
+            incremental detection.
+        :return: Bounding rectangles (x, y, width, height) relative to
+            the screenshot.
+        """
+        if window_key and application_rules["incremental"]:
+            rects = self.detect_rects_incrementally(
+                gray_image, application_rules, window_key
+            )
+        else:
+            rects = self.detect_rects(gray_image, application_rules)
+        self.check_cancelled()
+
+        return [
+            tuple(rect)
+            for rect in filter_rects(
+                rects, gray_image.shape[0] * gray_image.shape[1], application_rules
+            ).tolist()
+        ]
 
     def get_children(self) -> list[Child]:
         """Get children.
@@ -62,32 +357,20 @@ class OpenCV(HintsBackend):
                 # in sway, we need to exclude the top bar from the screenshot region
                 window_extents_offsets = (0, self.window_system.bar_height, 0, 0)
 
-        gray_image = cvtColor(
-            array(
-                self.screenshot(
-                    self.window_system.focused_window_extents,
-                    window_extents_offsets=window_extents_offsets,
-                )
-            ),
-            COLOR_BGR2GRAY,
+        gray_image = self.screenshot(
+            self.window_system.focused_window_extents,
+            window_extents_offsets=window_extents_offsets,
         )
+        self.check_cancelled()
 
-        edges = Canny(
-            gray_image,
-            application_rules["canny_min_val"],
-            application_rules["canny_max_val"],
-        )
-
-        kernel = ones(
-            (application_rules["kernel_size"], application_rules["kernel_size"]), uint8
+        window_key = "{}:{},{},{},{}".format(
+            self.window_system.focused_applicaiton_name,
+            *self.window_system.focused_window_extents,
         )
 
-        dilated_edges = dilate(edges, kernel)
-
-        contours, _ = findContours(dilated_edges, RETR_LIST, CHAIN_APPROX_SIMPLE)
-
-        for contour in contours:
-            x, y, w, h = boundingRect(contour)
+        for x, y, w, h in self.get_bounding_rects(
+            gray_image, application_rules, window_key
+        ):
             children.append(
                 Child(
                     absolute_position=(
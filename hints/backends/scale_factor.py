@@ -0,0 +1,177 @@
+"""Automatic scale factor detection for the Atspi backend.
+
+Some toolkits report extents in a different scale than the window system
+(ex: logical pixels on a HiDPI monitor where the window system uses
+physical pixels). Instead of a scale factor configured per application,
+the scale factor can be detected by comparing the size Atspi reports for
+the window with the size the window system reports. The ratio is snapped
+to the scale factors expected on the window's monitor, so window
+decorations included in one size but not the other do not skew it.
+
+Detected scale factors are cached per application, monitor and monitor
+scale factor. hints runs as a new process every time it is invoked, so
+the cache lives in $XDG_RUNTIME_DIR along with the monitor layout it was
+detected for, and is dropped when the layout changes.
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import cache
+from json import dump, load
+from math import log
+from typing import Callable
+
+from hints.constants import CACHE_DIRECTORY
+from hints.monitor_layout import MonitorLayout
+from hints.utils import get_cache_directory
+
+logger = logging.getLogger(__name__)
+
+SCALE_FACTOR_CACHE_FILE = CACHE_DIRECTORY / "scale_factors.json"
+# how far (relative) the size ratio can be from an expected scale factor
+SCALE_FACTOR_TOLERANCE = 0.15
+
+
+def snap_scale_factor(ratio: float, monitor_scale_factor: float) -> float:
+    """Snap a size ratio to the closest expected scale factor.
+
+    :param ratio: Window system size / Atspi size.
+    :param monitor_scale_factor: Scale factor of the window's monitor.
+    :return: The scale factor, 1 if the ratio is not close to any
+        expected scale factor.
+    """
+    candidates = {1, monitor_scale_factor, 1 / monitor_scale_factor}
+    closest = min(candidates, key=lambda candidate: abs(log(ratio / candidate)))
+
+    if abs(log(ratio / closest)) > log(1 + SCALE_FACTOR_TOLERANCE):
+        logger.debug("Size ratio %f is not close to any expected scale factor.", ratio)
+        return 1
+
+    return closest
+
+
+class ScaleFactorDetector:
+    """Detect and cache application scale factors."""
+
+    def __init__(self, layout: MonitorLayout):
+        """Scale factor detector constructor.
+
+        :param layout: Monitor layout.
+        """
+        self.layout = layout
+        self.scale_factors: dict[str, float] | None = None
+
+    @property
+    def layout_key(self) -> str:
+        """Get a key identifying the monitor layout.
+
+        :return: Layout key.
+        """
+        return repr(
+            [
+                (
+                    monitor.model,
+                    monitor.x,
+                    monitor.y,
+                    monitor.width,
+                    monitor.height,
+                    monitor.scale_factor,
+                )
+                for monitor in self.layout.monitors
+            ]
+        )
+
+    def load(self) -> dict[str, float]:
+        """Load cached scale factors.
+
+        :return: Scale factors by application, monitor and monitor scale
+            factor.
+        """
+        if self.scale_factors is None:
+            self.scale_factors = {}
+            try:
+                get_cache_directory()
+                with open(SCALE_FACTOR_CACHE_FILE, encoding="utf-8") as _f:
+                    cache_file = load(_f)
+                if cache_file.get("layout") == self.layout_key:
+                    self.scale_factors = cache_file["scale_factors"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+        return self.scale_factors
+
+    def save(self):
+        """Save cached scale factors."""
+        try:
+            get_cache_directory()
+            with open(SCALE_FACTOR_CACHE_FILE, "w", encoding="utf-8") as _f:
+                dump(
+                    {"layout": self.layout_key, "scale_factors": self.scale_factors},
+                    _f,
+                )
+        except OSError as error:
+            logger.debug("Could not save the scale factor cache: %s", error)
+
+    def get_scale_factor(
+        self,
+        application: str,
+        window_extents: tuple[int, int, int, int],
+        get_atspi_window_size: Callable[[], tuple[int, int]],
+    ) -> float:
+        """Get the scale factor for an application's window.
+
+        :param application: Application name.
+        :param window_extents: Window extents from the window system (x,
+            y, width, height).
+        :param get_atspi_window_size: Gets the window size from Atspi,
+            only called when the scale factor is not cached.
+        :return: The scale factor.
+        """
+        x, y, width, height = window_extents
+        monitor = self.layout.monitor_at(x + width / 2, y + height / 2)
+        monitor_scale_factor = monitor.scale_factor if monitor else 1
+        key = "{}|{}@{},{}|{}".format(
+            application,
+            monitor.model if monitor else "",
+            monitor.x if monitor else 0,
+            monitor.y if monitor else 0,
+            monitor_scale_factor,
+        )
+
+        scale_factors = self.load()
+        if key in scale_factors:
+            return scale_factors[key]
+
+        atspi_width, atspi_height = get_atspi_window_size()
+        if atspi_width <= 0 or atspi_height <= 0 or width <= 0 or height <= 0:
+            return 1
+
+        # the larger dimension is the least affected by decorations
+        if atspi_width >= atspi_height:
+            ratio = width / atspi_width
+        else:
+            ratio = height / atspi_height
+        scale_factor = snap_scale_factor(ratio, monitor_scale_factor)
+
+        logger.debug(
+            "Detected scale factor %s for '%s' (size ratio %f, monitor scale %s).",
+            scale_factor,
+            application,
+            ratio,
+            monitor_scale_factor,
+        )
+
+        scale_factors[key] = scale_factor
+        self.save()
+
+        return scale_factor
+
+
+@cache
+def get_scale_factor_detector() -> ScaleFactorDetector:
+    """Get the scale factor detector for the default display.
+
+    :return: Scale factor detector.
+    """
+    return ScaleFactorDetector(MonitorLayout())
@@ -0,0 +1,408 @@
+"""Screen capture engines for the OpenCV backend.
+
+Every engine returns the captured area as a grayscale NumPy array, ready
+for edge detection, without going through PIL.
+
+- xshm: MIT-SHM on X11. The X server writes the pixels into a shared
+  memory segment which is converted to grayscale in place (no copies of
+  the color image).
+- wlr_screencopy: wlroots compositors (sway, Hyprland) through grim,
+  which implements the wlr-screencopy protocol. This still spawns a
+  process per capture (a native client would need a Wayland client
+  library hints does not depend on), but the image is streamed as a
+  binary PPM and wrapped without decoding.
+- pyscreenshot: the original, portable, capture path.
+
+Engines raise CaptureEngineUnavailable when they cannot capture, and the
+OpenCV backend falls back to pyscreenshot.
+"""
+
+from __future__ import annotations
+
+import logging
+from ctypes import (
+    CDLL,
+    CFUNCTYPE,
+    POINTER,
+    Structure,
+    byref,
+    cast,
+    c_char_p,
+    c_int,
+    c_size_t,
+    c_ubyte,
+    c_uint,
+    c_ulong,
+    c_void_p,
+)
+from ctypes.util import find_library
+from subprocess import CalledProcessError, run
+from typing import TYPE_CHECKING
+
+from cv2 import COLOR_BGR2GRAY, COLOR_BGRA2GRAY, COLOR_RGB2GRAY, cvtColor
+from numpy import array, frombuffer, ndarray, uint8, zeros
+
+from hints.backends.exceptions import CaptureEngineUnavailable
+from hints.window_systems.window_system_type import WindowSystemType
+
+if TYPE_CHECKING:
+    from hints.window_systems.window_system import WindowSystem
+
+logger = logging.getLogger(__name__)
+
+# int (*)(Display *, XErrorEvent *)
+XErrorHandler = CFUNCTYPE(c_int, c_void_p, c_void_p)
+
+
+class ScreenCapture:
+    """Screen capture engine base class."""
+
+    name = ""
+
+    def capture(self, x: int, y: int, width: int, height: int) -> ndarray:
+        """Capture an area of the screen.
+
+        :param x: X position of the area.
+        :param y: Y position of the area.
+        :param width: Width of the area.
+        :param height: Height of the area.
+        :return: Grayscale image of the area.
+        :raises CaptureEngineUnavailable: When the engine cannot be used
+            on this system.
+        """
+        raise NotImplementedError()
+
+
+class PyscreenshotCapture(ScreenCapture):
+    """Capture using pyscreenshot."""
+
+    name = "pyscreenshot"
+
+    def capture(self, x: int, y: int, width: int, height: int) -> ndarray:
+        import pyscreenshot as ImageGrab
+
+        # the previous pipeline has always used BGR2GRAY on pyscreenshot's
+        # RGB images, keep it so detection results are unchanged.
+        return cvtColor(
+            array(ImageGrab.grab((x, y, x + width, y + height))), COLOR_BGR2GRAY
+        )
+
+
+class XImage(Structure):
+    """Leading fields of Xlib's XImage."""
+
+    _fields_ = [
+        ("width", c_int),
+        ("height", c_int),
+        ("xoffset", c_int),
+        ("format", c_int),
+        ("data", c_void_p),
+        ("byte_order", c_int),
+        ("bitmap_unit", c_int),
+        ("bitmap_bit_order", c_int),
+        ("bitmap_pad", c_int),
+        ("depth", c_int),
+        ("bytes_per_line", c_int),
+        ("bits_per_pixel", c_int),
+    ]
+
+
+class XShmSegmentInfo(Structure):
+    """Xlib's XShmSegmentInfo."""
+
+    _fields_ = [
+        ("shmseg", c_ulong),
+        ("shmid", c_int),
+        ("shmaddr", c_void_p),
+        ("readOnly", c_int),
+    ]
+
+
+class XShmCapture(ScreenCapture):
+    """Capture using the MIT-SHM X11 extension."""
+
+    name = "xshm"
+
+    Z_PIXMAP = 2
+    ALL_PLANES = c_ulong(-1)
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+
+    def __init__(self):
+        xlib_path = find_library("X11")
+        xext_path = find_library("Xext")
+        libc_path = find_library("c")
+
+        if not (xlib_path and xext_path and libc_path):
+            raise CaptureEngineUnavailable(self.name, "libX11 or libXext not found")
+
+        self.xlib = CDLL(xlib_path)
+        self.xext = CDLL(xext_path)
+        self.libc = CDLL(libc_path, use_errno=True)
+
+        self.xlib.XOpenDisplay.argtypes = [c_char_p]
+        self.xlib.XOpenDisplay.restype = c_void_p
+        self.xlib.XDefaultScreen.argtypes = [c_void_p]
+        self.xlib.XDefaultRootWindow.argtypes = [c_void_p]
+        self.xlib.XDefaultRootWindow.restype = c_ulong
+        self.xlib.XDefaultVisual.argtypes = [c_void_p, c_int]
+        self.xlib.XDefaultVisual.restype = c_void_p
+        self.xlib.XDefaultDepth.argtypes = [c_void_p, c_int]
+        self.xlib.XDisplayWidth.argtypes = [c_void_p, c_int]
+        self.xlib.XDisplayHeight.argtypes = [c_void_p, c_int]
+        self.xlib.XSetErrorHandler.argtypes = [c_void_p]
+        self.xlib.XSetErrorHandler.restype = c_void_p
+        self.xlib.XSync.argtypes = [c_void_p, c_int]
+        self.xlib.XDestroyImage.argtypes = [POINTER(XImage)]
+        self.xlib.XCloseDisplay.argtypes = [c_void_p]
+
+        self.xext.XShmQueryExtension.argtypes = [c_void_p]
+        self.xext.XShmCreateImage.argtypes = [
+            c_void_p,
+            c_void_p,
+            c_uint,
+            c_int,
+            c_void_p,
+            POINTER(XShmSegmentInfo),
+            c_uint,
+            c_uint,
+        ]
+        self.xext.XShmCreateImage.restype = POINTER(XImage)
+        self.xext.XShmAttach.argtypes = [c_void_p, POINTER(XShmSegmentInfo)]
+        self.xext.XShmDetach.argtypes = [c_void_p, POINTER(XShmSegmentInfo)]
+        self.xext.XShmGetImage.argtypes = [
+            c_void_p,
+            c_ulong,
+            POINTER(XImage),
+            c_int,
+            c_int,
+            c_ulong,
+        ]
+
+        self.libc.shmget.argtypes = [c_int, c_size_t, c_int]
+        self.libc.shmat.argtypes = [c_int, c_void_p, c_int]
+        self.libc.shmat.restype = c_void_p
+        self.libc.shmdt.argtypes = [c_void_p]
+        self.libc.shmctl.argtypes = [c_int, c_int, c_void_p]
+
+        # Xlib's default error handler exits the process, errors are
+        # recorded instead while capturing.
+        self.x_error = False
+        self.error_handler = XErrorHandler(self.on_x_error)
+
+        self.display = self.xlib.XOpenDisplay(None)
+        if not self.display:
+            raise CaptureEngineUnavailable(self.name, "could not open the X display")
+
+        if not self.xext.XShmQueryExtension(self.display):
+            self.xlib.XCloseDisplay(self.display)
+            raise CaptureEngineUnavailable(self.name, "MIT-SHM is not supported")
+
+    def on_x_error(self, _display: int, _event: int) -> int:
+        """Record an X error instead of exiting.
+
+        :return: Ignored by Xlib.
+        """
+        self.x_error = True
+        return 0
+
+    def capture(self, x: int, y: int, width: int, height: int) -> ndarray:
+        # XShmGetImage fails with BadMatch when the area is not entirely on
+        # the root window (ex: a window partly off-screen), so only the
+        # on-screen part is captured and the rest is left black.
+        screen = self.xlib.XDefaultScreen(self.display)
+        left = max(x, 0)
+        top = max(y, 0)
+        right = min(x + width, self.xlib.XDisplayWidth(self.display, screen))
+        bottom = min(y + height, self.xlib.XDisplayHeight(self.display, screen))
+
+        if (left, top, right, bottom) == (x, y, x + width, y + height):
+            return self.capture_on_screen(x, y, width, height)
+
+        gray_image = zeros((max(height, 0), max(width, 0)), dtype=uint8)
+        if right > left and bottom > top:
+            gray_image[top - y : bottom - y, left - x : right - x] = (
+                self.capture_on_screen(left, top, right - left, bottom - top)
+            )
+
+        return gray_image
+
+    def capture_on_screen(self, x: int, y: int, width: int, height: int) -> ndarray:
+        """Capture an area that is entirely on the root window.
+
+        :param x: X position of the area.
+        :param y: Y position of the area.
+        :param width: Width of the area.
+        :param height: Height of the area.
+        :return: Grayscale image of the area.
+        :raises CaptureEngineUnavailable: When the X server could not
+            capture the area.
+        """
+        screen = self.xlib.XDefaultScreen(self.display)
+        shm_info = XShmSegmentInfo()
+        ximage = self.xext.XShmCreateImage(
+            self.display,
+            self.xlib.XDefaultVisual(self.display, screen),
+            self.xlib.XDefaultDepth(self.display, screen),
+            self.Z_PIXMAP,
+            None,
+            byref(shm_info),
+            width,
+            height,
+        )
+
+        if not ximage:
+            raise CaptureEngineUnavailable(self.name, "could not create image")
+
+        bits_per_pixel = ximage.contents.bits_per_pixel
+        if bits_per_pixel != 32:
+            self.xlib.XDestroyImage(ximage)
+            raise CaptureEngineUnavailable(
+                self.name, f"unsupported depth ({bits_per_pixel} bpp)"
+            )
+
+        size = ximage.contents.bytes_per_line * height
+        shm_info.shmid = self.libc.shmget(
+            self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600
+        )
+
+        if shm_info.shmid < 0:
+            self.xlib.XDestroyImage(ximage)
+            raise CaptureEngineUnavailable(self.name, "could not allocate memory")
+
+        shm_info.shmaddr = self.libc.shmat(shm_info.shmid, None, 0)
+        shm_info.readOnly = 0
+        ximage.contents.data = shm_info.shmaddr
+
+        self.x_error = False
+        previous_error_handler = self.xlib.XSetErrorHandler(
+            cast(self.error_handler, c_void_p)
+        )
+
+        try:
+            self.xext.XShmAttach(self.display, byref(shm_info))
+            self.xlib.XSync(self.display, 0)
+            # the segment is removed once both processes detach
+            self.libc.shmctl(shm_info.shmid, self.IPC_RMID, None)
+
+            captured = self.xext.XShmGetImage(
+                self.display,
+                self.xlib.XDefaultRootWindow(self.display),
+                ximage,
+                x,
+                y,
+                self.ALL_PLANES,
+            )
+
+            if not captured or self.x_error:
+                raise CaptureEngineUnavailable(
+                    self.name, "the X server could not capture the area"
+                )
+
+            pixels = frombuffer(
+                (c_ubyte * size).from_address(shm_info.shmaddr), dtype=uint8
+            ).reshape(height, ximage.contents.bytes_per_line // 4, 4)[:, :width]
+
+            return cvtColor(pixels, COLOR_BGRA2GRAY)
+        finally:
+            self.xext.XShmDetach(self.display, byref(shm_info))
+            # errors are reported asynchronously, handle them before the
+            # previous error handler is restored.
+            self.xlib.XSync(self.display, 0)
+            self.xlib.XSetErrorHandler(previous_error_handler)
+            # XDestroyImage frees data, which is the shared memory segment
+            ximage.contents.data = None
+            self.xlib.XDestroyImage(ximage)
+            self.libc.shmdt(shm_info.shmaddr)
+
+    def __del__(self):
+        if getattr(self, "display", None):
+            self.xlib.XCloseDisplay(self.display)
+
+
+class WlrScreencopyCapture(ScreenCapture):
+    """Capture using the wlr-screencopy protocol (through grim).
+
+    grim is spawned for every capture.
+    """
+
+    name = "wlr_screencopy"
+
+    def capture(self, x: int, y: int, width: int, height: int) -> ndarray:
+        try:
+            grim = run(
+                # scale 1 keeps the image in the same (logical) coordinates as
+                # the window extents on HiDPI outputs.
+                [
+                    "grim",
+                    "-t",
+                    "ppm",
+                    "-s",
+                    "1",
+                    "-g",
+                    f"{x},{y} {width}x{height}",
+                    "-",
+                ],
+                capture_output=True,
+                check=True,
+            )
+        except CalledProcessError as error:
+            raise CaptureEngineUnavailable(
+                self.name, error.stderr.decode(errors="replace").strip()
+            ) from error
+        except OSError as error:
+            raise CaptureEngineUnavailable(self.name, str(error)) from error
+
+        # binary PPM: "P6\n<width> <height>\n255\n<rgb bytes>"
+        try:
+            magic, size, _, pixels = grim.stdout.split(b"\n", maxsplit=3)
+            ppm_width, ppm_height = size.split()
+
+            if magic != b"P6":
+                raise ValueError(magic)
+
+            return cvtColor(
+                frombuffer(pixels, dtype=uint8).reshape(
+                    int(ppm_height), int(ppm_width), 3
+                ),
+                COLOR_RGB2GRAY,
+            )
+        except ValueError as error:
+            raise CaptureEngineUnavailable(
+                self.name, "unexpected image format"
+            ) from error
+
+
+CAPTURE_ENGINES: dict[str, type[ScreenCapture]] = {
+    engine.name: engine
+    for engine in (
+        PyscreenshotCapture,
+        XShmCapture,
+        WlrScreencopyCapture,
+    )
+}
+
+
+def get_screen_capture(engine: str, window_system: WindowSystem) -> ScreenCapture:
+    """Get a screen capture engine.
+
+    :param engine: The name of the engine to use, or "auto" to pick the
+        best engine for the window system.
+    :param window_system: The window system.
+    :return: Screen capture engine, pyscreenshot when the requested
+        engine is unavailable.
+    """
+    if engine == "auto":
+        engine = "pyscreenshot"
+
+        if window_system.window_system_name in {"sway", "Hyprland"}:
+            engine = "wlr_screencopy"
+        elif window_system.window_system_type == WindowSystemType.X11:
+            engine = "xshm"
+
+    try:
+        return CAPTURE_ENGINES[engine]()
+    except CaptureEngineUnavailable as error:
+        logger.debug("%s, falling back to pyscreenshot.", error)
+        return PyscreenshotCapture()
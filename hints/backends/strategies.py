@@ -0,0 +1,278 @@
+"""Strategies to gather children using the enabled backends.
+
+- sequential: try backends in order, use the first one that finds
+  children.
+- merge: run backends concurrently and fuse their results. Children
+  from backends earlier in the order are preferred, children from later
+  backends are only added in areas that earlier backends did not cover.
+- race: run backends concurrently and use the result of the first
+  backend, in order, that finds children. The other backends are
+  cancelled, and run in daemon threads so the ones still finishing a
+  slow call do not delay exiting.
+
+Backends are prepared (see HintsBackend.prepare) on the calling thread,
+only gathering children runs concurrently.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Thread
+from time import time
+from typing import TYPE_CHECKING
+
+from numpy import array, maximum, minimum
+
+from hints.backends.atspi import AtspiBackend
+from hints.backends.exceptions import (
+    AccessibleChildrenNotFoundError,
+    BackendCancelledError,
+)
+from hints.backends.opencv import OpenCV
+from hints.tracing import tracer
+
+if TYPE_CHECKING:
+    from hints.backends.backend import HintsBackend
+    from hints.child import Child
+    from hints.utils import HintsConfig
+    from hints.window_systems.window_system import WindowSystem
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {"atspi": AtspiBackend, "opencv": OpenCV}
+
+
+def prepare_backend(current_backend: HintsBackend) -> HintsBackend:
+    """Prepare a backend on the calling thread.
+
+    :param current_backend: The backend.
+    :return: The prepared backend.
+    """
+    with tracer.span(f"{current_backend.backend_name}.prepare"):
+        current_backend.prepare()
+
+    return current_backend
+
+
+def run_backend(current_backend: HintsBackend) -> list[Child]:
+    """Get children using a backend.
+
+    :param current_backend: The backend.
+    :return: The children found, empty if the backend did not find any
+        or was cancelled.
+    """
+    start = time()
+    backend = current_backend.backend_name
+    logger.debug(
+        "Attempting to get accessible children using the '%s' backend.",
+        backend,
+    )
+
+    try:
+        with tracer.span(f"{backend}.get_children") as span:
+            children = current_backend.get_children()
+            span["args"]["children"] = len(children)
+    except AccessibleChildrenNotFoundError:
+        logger.debug(
+            "No acceessible children found with the '%s' backend.",
+            backend,
+        )
+        return []
+    except BackendCancelledError:
+        logger.debug("The '%s' backend was cancelled.", backend)
+        return []
+
+    logger.debug("Gathering hints took %f seconds", time() - start)
+    logger.debug("Gathered %d hints", len(children))
+
+    return children
+
+
+def run_backend_in_daemon_thread(current_backend: HintsBackend) -> Future[list[Child]]:
+    """Get children using a backend in a daemon thread.
+
+    Executor workers are joined when the interpreter exits, daemon threads
+    are not.
+
+    :param current_backend: The backend.
+    :return: Future for the children found.
+    """
+    result: Future[list[Child]] = Future()
+
+    def run():
+        try:
+            result.set_result(run_backend(current_backend))
+        except BaseException as error:  # raised again by result.result()
+            result.set_exception(error)
+
+    Thread(
+        target=run, name=f"hints-{current_backend.backend_name}", daemon=True
+    ).start()
+
+    return result
+
+
+def get_children_sequentially(
+    config: HintsConfig, window_system: WindowSystem
+) -> list[Child]:
+    """Get children from the first backend that finds any.
+
+    :param config: Hints config.
+    :param window_system: Window System for the session.
+    :return: Children.
+    """
+    for backend in config.backends.enable:
+        current_backend = prepare_backend(BACKENDS[backend](config, window_system))
+        if children := run_backend(current_backend):
+            return children
+
+    return []
+
+
+def merge_children(
+    children: list[Child], other_children: list[Child], overlap_threshold: float
+) -> list[Child]:
+    """Add children to a list of children in areas it does not cover.
+
+    :param children: Preferred children.
+    :param other_children: Children to add.
+    :param overlap_threshold: Ratio of an other child's area covered by
+        any preferred child above which it is considered covered.
+    :return: Merged children.
+    """
+    if not children or not other_children:
+        return children or other_children
+
+    boxes = array(
+        [(*child.absolute_position, child.width, child.height) for child in children],
+        dtype=float,
+    )
+    other_boxes = array(
+        [
+            (*child.absolute_position, child.width, child.height)
+            for child in other_children
+        ],
+        dtype=float,
+    )
+
+    # intersections between every other box (rows) and every box (columns)
+    intersection_width = maximum(
+        minimum(
+            other_boxes[:, None, 0] + other_boxes[:, None, 2],
+            boxes[None, :, 0] + boxes[None, :, 2],
+        )
+        - maximum(other_boxes[:, None, 0], boxes[None, :, 0]),
+        0,
+    )
+    intersection_height = maximum(
+        minimum(
+            other_boxes[:, None, 1] + other_boxes[:, None, 3],
+            boxes[None, :, 1] + boxes[None, :, 3],
+        )
+        - maximum(other_boxes[:, None, 1], boxes[None, :, 1]),
+        0,
+    )
+    coverage = (intersection_width * intersection_height).max(axis=1) / maximum(
+        other_boxes[:, 2] * other_boxes[:, 3], 1
+    )
+
+    return children + [
+        child
+        for child, covered in zip(other_children, coverage > overlap_threshold)
+        if not covered
+    ]
+
+
+def get_children_merged(
+    config: HintsConfig, window_system: WindowSystem
+) -> list[Child]:
+    """Get children from all backends concurrently and merge them.
+
+    :param config: Hints config.
+    :param window_system: Window System for the session.
+    :return: Children.
+    """
+    backends = config.backends.enable
+
+    with ThreadPoolExecutor(max_workers=len(backends)) as executor:
+        # every backend starts as soon as it is prepared
+        results = [
+            executor.submit(
+                run_backend, prepare_backend(BACKENDS[backend](config, window_system))
+            )
+            for backend in backends
+        ]
+
+    children: list[Child] = []
+    for backend, result in zip(backends, results):
+        backend_children = result.result()
+        merged_children = merge_children(
+            children,
+            backend_children,
+            config.backends.merge_overlap_threshold,
+        )
+        logger.debug(
+            "Merged %d of %d children from the '%s' backend.",
+            len(merged_children) - len(children),
+            len(backend_children),
+            backend,
+        )
+        children = merged_children
+
+    return children
+
+
+def get_children_racing(
+    config: HintsConfig, window_system: WindowSystem
+) -> list[Child]:
+    """Get children from the first backend, in order, that finds any with
+    all backends running concurrently.
+
+    A backend's result is used as soon as every backend before it has
+    finished without finding children, so the worst case is the slowest
+    backend rather than the sum of all of them.
+
+    :param config: Hints config.
+    :param window_system: Window System for the session.
+    :return: Children.
+    """
+    backends = [
+        BACKENDS[backend](config, window_system) for backend in config.backends.enable
+    ]
+    children: list[Child] = []
+
+    try:
+        results = [
+            run_backend_in_daemon_thread(prepare_backend(current_backend))
+            for current_backend in backends
+        ]
+
+        for current_backend, result in zip(backends, results):
+            if children := result.result():
+                logger.debug(
+                    "The '%s' backend won the race.", current_backend.backend_name
+                )
+                break
+    finally:
+        # losers stop at their next cancellation check
+        for current_backend in backends:
+            current_backend.cancel()
+
+    return children
+
+
+def get_children(config: HintsConfig, window_system: WindowSystem) -> list[Child]:
+    """Get children using the configured strategy.
+
+    :param config: Hints config.
+    :param window_system: Window System for the session.
+    :return: Children.
+    """
+    match config.backends.strategy:
+        case "merge":
+            return get_children_merged(config, window_system)
+        case "race":
+            return get_children_racing(config, window_system)
+        case _:
+            return get_children_sequentially(config, window_system)
@@ -0,0 +1,259 @@
+"""Typed hints config.
+
+The config is resolved from layers, the defaults followed by the user's
+overrides, into frozen objects with a slot per key, so reading a value
+is an attribute lookup instead of string keyed dict lookups. Layers are
+never modified: a key takes its value from the last layer that sets it,
+and only the sections overrides touch are resolved from more than one
+layer. Application rules are kept as layers and resolved for an
+application the first time its rules are needed.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+ConfigLayer = dict[str, Any]
+
+
+def overlay_configs(base: ConfigLayer, overlay: ConfigLayer) -> ConfigLayer:
+    """Deepmerge an overlay over a config without modifying either.
+
+    Only the dicts on the overlay's paths are copied, the rest of the
+    base is shared with the result.
+
+    :param base: Base config.
+    :param overlay: Overlay config.
+    :return: Merged config.
+    """
+    merged = dict(base)
+
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = overlay_configs(merged[key], value)
+        else:
+            merged[key] = value
+
+    return merged
+
+
+class ApplicationRules:
+    """Application rules resolved per application.
+
+    Every layer maps application names (and "default") to rules. The
+    rules of an application are its "default" rules from every layer
+    with its own rules from every layer on top, all deepmerged. They are
+    resolved the first time they are needed and shared afterwards, so
+    they must not be modified.
+    """
+
+    __slots__ = ("layers", "resolved")
+
+    def __init__(self, *layers: dict[str, ConfigLayer]):
+        """Application rules constructor.
+
+        :param layers: Application rules layers, later layers override
+            earlier ones.
+        """
+        self.layers = layers
+        self.resolved: dict[str, ConfigLayer] = {}
+
+    def __getstate__(self) -> tuple:
+        return self.layers
+
+    def __setstate__(self, state: tuple):
+        self.layers = state
+        self.resolved = {}
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ApplicationRules) and self.layers == other.layers
+
+    def __repr__(self) -> str:
+        return f"ApplicationRules{self.layers!r}"
+
+    def get(self, application: str) -> ConfigLayer:
+        """Get the rules for an application.
+
+        :param application: Application name.
+        :return: The application rules.
+        """
+        if (rules := self.resolved.get(application)) is None:
+            if (rules := self.resolved.get("default")) is None:
+                rules = {}
+                for layer in self.layers:
+                    rules = overlay_configs(rules, layer.get("default", {}))
+                self.resolved["default"] = rules
+
+            for layer in self.layers:
+                if application in layer:
+                    rules = overlay_configs(rules, layer[application])
+            self.resolved[application] = rules
+
+        return rules
+
+
+class ConfigSection:
+    """Frozen config section.
+
+    Subclasses list their keys in __slots__, the keys holding nested
+    sections in SECTIONS and the keys holding application rules in
+    APPLICATION_RULES. Lists are stored as tuples.
+    """
+
+    __slots__ = ()
+    SECTIONS: dict[str, type[ConfigSection]] = {}
+    APPLICATION_RULES: tuple[str, ...] = ()
+
+    def __init__(self, *layers: ConfigLayer):
+        """Config section constructor.
+
+        :param layers: Values of the section, later layers override
+            earlier ones. Every key must be set by at least one layer.
+        :raises KeyError: When no layer sets a key.
+        """
+        for key in self.__slots__:
+            values = [layer[key] for layer in layers if key in layer]
+            if not values:
+                raise KeyError(key)
+
+            if key in self.SECTIONS:
+                value = self.SECTIONS[key](*values)
+            elif key in self.APPLICATION_RULES:
+                value = ApplicationRules(*values)
+            elif isinstance(values[-1], list):
+                value = tuple(values[-1])
+            else:
+                value = values[-1]
+
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is frozen.")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is frozen.")
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __setstate__(self, state: tuple):
+        for key, value in zip(self.__slots__, state):
+            object.__setattr__(self, key, value)
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and (
+            self.__getstate__() == other.__getstate__()  # type: ignore[attr-defined]
+        )
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+class HintAppearanceConfig(ConfigSection):
+    """Hint appearance ("hints" key)."""
+
+    __slots__ = (
+        "hint_height",
+        "hint_width_padding",
+        "hint_font_size",
+        "hint_font_face",
+        "hint_font_r",
+        "hint_font_g",
+        "hint_font_b",
+        "hint_font_a",
+        "hint_pressed_font_r",
+        "hint_pressed_font_g",
+        "hint_pressed_font_b",
+        "hint_pressed_font_a",
+        "hint_upercase",
+        "hint_background_r",
+        "hint_background_g",
+        "hint_background_b",
+        "hint_background_a",
+    )
+
+
+class AtspiConfig(ConfigSection):
+    """Atspi backend config."""
+
+    __slots__ = ("application_rules",)
+    APPLICATION_RULES = ("application_rules",)
+
+
+class OpenCVConfig(ConfigSection):
+    """OpenCV backend config."""
+
+    __slots__ = ("capture_engine", "application_rules")
+    APPLICATION_RULES = ("application_rules",)
+
+
+class BackendsConfig(ConfigSection):
+    """Backends config."""
+
+    __slots__ = ("enable", "strategy", "merge_overlap_threshold", "atspi", "opencv")
+    SECTIONS = {"atspi": AtspiConfig, "opencv": OpenCVConfig}
+
+
+class WritePausesConfig(ConfigSection):
+    """Pauses hintsd waits after writing mouse events."""
+
+    __slots__ = ("move", "button", "scroll")
+
+
+class GnomeExtensionTimeoutsConfig(ConfigSection):
+    """Timeouts for calls to the hints GNOME extension."""
+
+    __slots__ = ("focused_window_info", "position_window")
+
+
+class InstrumentationConfig(ConfigSection):
+    """Instrumentation config."""
+
+    __slots__ = ("enable", "output_file")
+
+
+class HintsConfig(ConfigSection):
+    """Hints config."""
+
+    __slots__ = (
+        "hints",
+        "backends",
+        "alphabet",
+        "mouse_move_left",
+        "mouse_move_right",
+        "mouse_move_up",
+        "mouse_move_down",
+        "mouse_scroll_left",
+        "mouse_scroll_right",
+        "mouse_scroll_up",
+        "mouse_scroll_down",
+        "mouse_move_pixel",
+        "mouse_move_pixel_sensitivity",
+        "mouse_move_rampup_time",
+        "mouse_scroll_pixel",
+        "mouse_scroll_pixel_sensitivity",
+        "mouse_scroll_rampup_time",
+        "mouse_tick_ms",
+        "mouse_steps_per_second",
+        "mouse_move_acceleration",
+        "mouse_scroll_acceleration",
+        "mouse_max_hold_time",
+        "mouse_write_pauses",
+        "exit_key",
+        "hover_modifier",
+        "grab_modifier",
+        "overlay_window",
+        "overlay_x_offset",
+        "overlay_y_offset",
+        "window_system",
+        "gnome_extension_timeouts",
+        "instrumentation",
+    )
+    SECTIONS = {
+        "hints": HintAppearanceConfig,
+        "backends": BackendsConfig,
+        "mouse_write_pauses": WritePausesConfig,
+        "gnome_extension_timeouts": GnomeExtensionTimeoutsConfig,
+        "instrumentation": InstrumentationConfig,
+    }
@@ -1,6 +1,7 @@
 """Global constant values."""
 
-from os import path
+from os import getenv, path
+from pathlib import Path
 
 from gi import require_version
 
@@ -12,6 +13,12 @@ CONFIG_PATH = path.join(path.expanduser("~"), ".config/hints/config.json")
 MOUSE_GRAB_PAUSE = 0.2
 UNIX_DOMAIN_SOCKET_FILE = "/tmp/hints.socket"
 SOCKET_MESSAGE_SIZE = 1024
+# caches kept between runs, $XDG_RUNTIME_DIR is a per user tmpfs. There is no
+# shared fallback (ex: /tmp), other users could plant files in it.
+CACHE_DIRECTORY = (
+    Path(getenv("XDG_RUNTIME_DIR") or path.join(path.expanduser("~"), ".cache"))
+    / "hints"
+)
 DEFAULT_CONFIG = {
     "hints": {
         "hint_height": 30,
@@ -34,9 +41,19 @@ DEFAULT_CONFIG = {
     },
     "backends": {
         "enable": ["atspi", "opencv"],
+        # "sequential": use the first backend (in "enable" order) that finds
+        # elements. "merge": run all backends concurrently, adding elements
+        # from later backends only where earlier ones found none (an element
+        # is covered when more than merge_overlap_threshold of its area is).
+        # "race": run all backends concurrently and use the first backend (in
+        # "enable" order) that finds elements, cancelling the others.
+        "strategy": "sequential",
+        "merge_overlap_threshold": 0.5,
         "atspi": {
             "application_rules": {
                 "default": {
+                    # scale applied to element extents, or "auto" to detect
+                    # it from the window and monitor scale.
                     "scale_factor": 1,
                     "states": [
                         Atspi.StateType.SENSITIVE,
@@ -75,11 +92,42 @@ DEFAULT_CONFIG = {
             },
         },
         "opencv": {
+            # one of "auto", "xshm" (X11), "wlr_screencopy" (sway, Hyprland,
+            # requires grim), "pyscreenshot".
+            "capture_engine": "auto",
             "application_rules": {
                 "default": {
                     "kernel_size": 6,
                     "canny_min_val": 100,
                     "canny_max_val": 200,
+                    # detect elements on an image downscaled by this factor
+                    # (ex: 0.5), boxes are mapped back to full resolution.
+                    "detection_scale": 1,
+                    # process the image in this many horizontal bands in
+                    # parallel.
+                    "tiles": 1,
+                    # "list" (all contours), "external" (outermost contours)
+                    # or "leaf" (contours that don't contain other contours)
+                    "contour_retrieval": "list",
+                    # filters for detected elements, min_area is in pixels,
+                    # max_area_ratio is relative to the window area, aspect
+                    # ratios are width / height (0 disables them).
+                    "min_area": 0,
+                    "max_area_ratio": 1,
+                    "min_aspect_ratio": 0,
+                    "max_aspect_ratio": 0,
+                    # drop elements containing more than this many elements
+                    # (0 disables it)
+                    "max_contained": 0,
+                    # drop elements overlapping a larger element by more than
+                    # this intersection over union (0 disables it)
+                    "nms_threshold": 0,
+                    # reuse the elements detected the last time hints ran on
+                    # the same window, only reprocessing tiles that changed
+                    # unless more than incremental_max_changed (ratio) did.
+                    "incremental": False,
+                    "incremental_tile_size": 64,
+                    "incremental_max_changed": 0.5,
                 }
             },
         },
@@ -99,10 +147,39 @@ DEFAULT_CONFIG = {
     "mouse_scroll_pixel": 5,
     "mouse_scroll_pixel_sensitivity": 5,
     "mouse_scroll_rampup_time": 0.5,
+    # while a key is held, hintsd moves / scrolls every mouse_tick_ms. The
+    # pixel sensitivity is the distance per step at mouse_steps_per_second
+    # steps a second (about a keyboard's repeat rate). After the rampup time,
+    # the speed grows by the acceleration times the initial speed every second.
+    "mouse_tick_ms": 16,
+    "mouse_steps_per_second": 30,
+    "mouse_move_acceleration": 4,
+    "mouse_scroll_acceleration": 4,
+    # seconds a key can be held before hintsd stops moving / scrolling for it,
+    # in case hints never sends the key going up (ex: it was killed).
+    "mouse_max_hold_time": 30,
+    # seconds hintsd waits after writing moves, button presses and scrolls,
+    # for compositors that drop events written too quickly. With 0, events
+    # of an action are written together in as few frames as possible.
+    "mouse_write_pauses": {"move": 0.03, "button": 0.03, "scroll": 0},
     "exit_key": Gdk.KEY_Escape,
     "hover_modifier": Gdk.ModifierType.CONTROL_MASK,
     "grab_modifier": Gdk.ModifierType.MOD1_MASK,  # Alt
+    # "default" or "lean" (draw hints directly on the overlay window)
+    "overlay_window": "default",
     "overlay_x_offset": 0,
     "overlay_y_offset": 0,
     "window_system": "",
+    # milliseconds to wait for the hints GNOME extension to answer before
+    # giving up (the call durations are logged with --verbose).
+    "gnome_extension_timeouts": {
+        "focused_window_info": 1000,
+        "position_window": 1000,
+    },
+    "instrumentation": {
+        # record overlay frame times and input latency, a summary is logged on
+        # exit and written to output_file (JSON) if set.
+        "enable": False,
+        "output_file": "",
+    },
 }
@@ -1,52 +1,210 @@
+"""Proxy for the hints GNOME Shell extension (uk.co.realh.Hints).
+
+Calls are started with Gio.DBusProxy.call and return a PendingCall right
+away, so the focused window can be queried while hints does other work
+and only waited for when it is needed. Every call has its own main
+context for its reply, so it can be waited for from any thread without
+dispatching the default main context's sources. Every call has a timeout from the
+config (gnome_extension_timeouts), and its duration is logged and traced.
+"""
+
+from __future__ import annotations
+
+import logging
+from threading import Lock
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from gi import require_version
+
+require_version("Gio", "2.0")
 from gi.repository import Gio, GLib
-from typing import Optional
 
-class DBusHintsProxy:
-    _instance = None
-    _proxy : Optional[Gio.DBusProxy] = None
-
-    def __init__(self):
-        if DBusHintsProxy._proxy is None:
-            proxy = Gio.DBusProxy.new_for_bus_sync(
-                    bus_type = Gio.BusType.SESSION,
-                    flags = Gio.DBusProxyFlags.NONE,
-                    info = None,
-                    name = "uk.co.realh.Hints",
-                    object_path = "/uk/co/realh/Hints",
-                    interface_name = "uk.co.realh.Hints"
-                )
-            DBusHintsProxy._proxy = proxy   # type: ignore
+from hints.tracing import tracer
+
+if TYPE_CHECKING:
+    from hints.config import GnomeExtensionTimeoutsConfig
+
+logger = logging.getLogger(__name__)
+
+BUS_NAME = "uk.co.realh.Hints"
+OBJECT_PATH = "/uk/co/realh/Hints"
+INTERFACE_NAME = "uk.co.realh.Hints"
+
+# x, y, width, height, pid, name, monitor, as returned by the extension when
+# no window is focused.
+NO_FOCUSED_WINDOW = (0, 0, 0, 0, -1, "", -1)
+
+
+class PendingCall:
+    """A call to the extension in flight."""
+
+    def __init__(self, method_name: str, timeout_ms: int):
+        """Pending call constructor.
+
+        :param method_name: Name of the method called.
+        :param timeout_ms: Timeout of the call in milliseconds.
+        """
+        self.method_name = method_name
+        self.timeout_ms = timeout_ms
+        self.done = False
+        self.value: tuple[Any, ...] = ()
+        self.error: GLib.Error | None = None
+        self.lock = Lock()
+        self.context = GLib.MainContext.new()
+        self.start = perf_counter()
+        self.span = tracer.start_span(f"dbus.{method_name}", timeout_ms=timeout_ms)
+
+    def on_done(self, proxy: Gio.DBusProxy, result: Gio.AsyncResult, *_):
+        """Store the result of the call when it finishes.
+
+        :param proxy: The proxy the call was made with.
+        :param result: Result of the call.
+        """
+        try:
+            self.value = proxy.call_finish(result).unpack()
+        except GLib.Error as error:
+            self.error = error
+
+        self.done = True
+        tracer.end_span(self.span)
+
+        elapsed_ms = (perf_counter() - self.start) * 1000
+        if self.error:
+            logger.warning(
+                "%s failed after %.1f ms (timeout %d ms): %s",
+                self.method_name,
+                elapsed_ms,
+                self.timeout_ms,
+                self.error.message,
+            )
         else:
-            proxy = DBusHintsProxy._proxy
-        self.proxy: Gio.DBusProxy = proxy   # type: ignore
-
-    def get_focused_window_info(self) \
-            -> tuple[int, int, int, int, int, str, int]:
-        """ Returns x, y, width, height, pid, name, monitor. """
-        return self.proxy.call_sync(
-                    method_name = "FocusedWindowInfo",
-                    parameters = None,
-                    flags = Gio.DBusCallFlags.NONE,
-                    timeout_msec = -1,
-                    cancellable = None
-                )   # type: ignore
-
-    def position_window(self, x, y, monitor, pid):
-        self.proxy.call_sync(
-                    method_name = "PositionWindow",
-                    parameters = GLib.Variant.new_tuple(
-                        GLib.Variant.new_int32(x),
-                        GLib.Variant.new_int32(y),
-                        GLib.Variant.new_int32(monitor),
-                        GLib.Variant.new_int32(pid),
-                    ),
-                    flags = Gio.DBusCallFlags.NONE,
-                    timeout_msec = 5,
-                    cancellable = None
-                )
+            logger.debug(
+                "%s took %.1f ms (timeout %d ms).",
+                self.method_name,
+                elapsed_ms,
+                self.timeout_ms,
+            )
+
+    def result(self) -> tuple[Any, ...]:
+        """Wait for the call to finish.
+
+        The reply is dispatched by the call's main context, which is
+        iterated until the call is done.
+
+        :return: Values returned by the method.
+        :raises GLib.Error: When the call failed or timed out.
+        """
+        with self.lock:
+            while not self.done:
+                self.context.iteration(True)
+
+        if self.error:
+            raise self.error
+
+        return self.value
+
+
+class DBusHintsProxy:
+    """Proxy for the hints GNOME Shell extension."""
+
+    _instance: DBusHintsProxy | None = None
+
+    def __init__(self, timeouts: GnomeExtensionTimeoutsConfig):
+        """DBus hints proxy constructor.
+
+        :param timeouts: Timeouts for calls in milliseconds.
+        """
+        self.timeouts = timeouts
+        # the extension has no properties or signals, skipping them saves
+        # round trips when creating the proxy.
+        self.proxy = Gio.DBusProxy.new_for_bus_sync(
+            Gio.BusType.SESSION,
+            Gio.DBusProxyFlags.DO_NOT_LOAD_PROPERTIES
+            | Gio.DBusProxyFlags.DO_NOT_CONNECT_SIGNALS,
+            None,
+            BUS_NAME,
+            OBJECT_PATH,
+            INTERFACE_NAME,
+            None,
+        )
+
+    def call_async(
+        self,
+        method_name: str,
+        timeout_ms: int,
+        parameters: GLib.Variant | None = None,
+    ) -> PendingCall:
+        """Start a call to the extension.
+
+        :param method_name: Name of the method to call.
+        :param timeout_ms: Timeout of the call in milliseconds.
+        :param parameters: Parameters of the method.
+        :return: The pending call.
+        """
+        pending_call = PendingCall(method_name, timeout_ms)
+
+        # the reply is dispatched to the thread default main context when
+        # the call is started.
+        pending_call.context.push_thread_default()
+        try:
+            self.proxy.call(
+                method_name,
+                parameters,
+                Gio.DBusCallFlags.NONE,
+                timeout_ms,
+                None,
+                pending_call.on_done,
+                None,
+            )
+        finally:
+            pending_call.context.pop_thread_default()
+
+        return pending_call
+
+    def get_focused_window_info_async(self) -> PendingCall:
+        """Start querying the focused window.
+
+        :return: The pending call, its result is (x, y, width, height,
+            pid, name, monitor).
+        """
+        return self.call_async("FocusedWindowInfo", self.timeouts.focused_window_info)
+
+    def get_focused_window_info(self) -> tuple[int, int, int, int, int, str, int]:
+        """Get the focused window.
+
+        :return: x, y, width, height, pid, name, monitor.
+        :raises GLib.Error: When the call failed or timed out.
+        """
+        return self.get_focused_window_info_async().result()  # type: ignore
+
+    def position_window(self, x: int, y: int, monitor: int, pid: int) -> PendingCall:
+        """Ask the extension to position the next window shown by a
+        process.
+
+        The extension only positions windows created after it answers, so
+        the result needs to be waited for before showing the window.
+
+        :param x: X position.
+        :param y: Y position.
+        :param monitor: Monitor index.
+        :param pid: Process ID of the process showing the window.
+        :return: The pending call.
+        """
+        return self.call_async(
+            "PositionWindow",
+            self.timeouts.position_window,
+            GLib.Variant("(iiii)", (x, y, monitor, pid)),
+        )
 
     @classmethod
-    def get_instance(cls):
+    def get_instance(cls, timeouts: GnomeExtensionTimeoutsConfig) -> DBusHintsProxy:
+        """Get the proxy shared by the process.
+
+        :param timeouts: Timeouts for calls in milliseconds, used when the
+            proxy is created.
+        :return: The proxy.
+        """
         if cls._instance is None:
-            cls._instance = DBusHintsProxy()
+            cls._instance = DBusHintsProxy(timeouts)
         return cls._instance
@@ -1,5 +1,4 @@
-from gi.repository import Gtk
-from hints.dbus import DBusHintsProxy
+from gi.repository import GLib, Gtk
 from hints.window_systems.window_system import WindowSystem
 from hints.window_systems.gnome import Gnome
 import os
@@ -10,5 +9,10 @@ def init_overlay_window(window: Gtk.Window,
     g_win_sys: Gnome = window_system    # type: ignore
     monitor = g_win_sys.focused_window_monitor
     pid = os.getpid()
-    dbus_proxy = DBusHintsProxy.get_instance()
-    dbus_proxy.position_window(x, y, monitor, pid)
+    # the extension only positions windows created after it answers
+    try:
+        g_win_sys.dbus_proxy.position_window(x, y, monitor, pid).result()
+    except GLib.Error:
+        # logged by the pending call, the window is shown where the
+        # compositor places it.
+        pass
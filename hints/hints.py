@@ -4,20 +4,18 @@ import logging
 from argparse import ArgumentParser
 from itertools import product
 from math import ceil, log
-from subprocess import run
-from time import time
 from typing import TYPE_CHECKING, Any, Iterable, Type, get_args
 
 from gi import require_version
 
-from hints.backends.atspi import AtspiBackend
-from hints.backends.exceptions import AccessibleChildrenNotFoundError
-from hints.backends.opencv import OpenCV
+from hints.backends.strategies import get_children
 from hints.huds.interceptor import InterceptorWindow
-from hints.huds.overlay import OverlayWindow
+from hints.huds.overlay import LeanOverlayWindow, OverlayWindow
 from hints.mouse import click
 from hints.mouse_enums import MouseButton, MouseButtonState
+from hints.tracing import traced, tracer
 from hints.utils import HintsConfig, load_config
+from hints.window_systems.detection import detect_wayland_window_system
 from hints.window_systems.exceptions import WindowSystemNotSupported
 from hints.window_systems.window_system import WindowSystem
 from hints.window_systems.window_system_type import (
@@ -40,6 +38,7 @@ require_version("Gdk", "3.0")
 from gi.repository import Gdk, Gtk
 
 
+@traced("display_gtk_window")
 def display_gtk_window(
     window_system: WindowSystem,
     gtk_window: Gtk.Window,
@@ -118,6 +117,7 @@ def display_gtk_window(
     Gtk.main()
 
 
+@traced("get_hints")
 def get_hints(children: list[Child], alphabet: str) -> dict[str, Child]:
     """Get hints.
 
@@ -147,114 +147,99 @@ def hint_mode(config: HintsConfig, window_system: WindowSystem):
     :param window_system: Window System for the session.
     :param mouse: Mouse device for mouse actions.
     """
-    window_extents = None
-    hints = {}
-
-    backends_map = {"atspi": AtspiBackend, "opencv": OpenCV}
-    backends = config["backends"]["enable"]
-
-    for backend in backends:
-
-        start = time()
-        current_backend = backends_map[backend](config, window_system)
-        logger.debug(
-            "Attempting to get accessible children using the '%s' backend.",
-            backend,
-        )
-        try:
-            children = current_backend.get_children()
-
-            logger.debug("Gathering hints took %f seconds", time() - start)
-            logger.debug("Gathered %d hints", len(children))
-
-            hints = get_hints(
-                children,
-                alphabet=config["alphabet"],
-            )
-
-            window_extents = current_backend.window_system.focused_window_extents
-
-        except AccessibleChildrenNotFoundError:
-            logger.debug(
-                "No acceessible children found with the '%s' backend.",
-                backend,
-            )
-
-        if window_extents and hints:
-            mouse_action: dict[str, Any] = {}
-            x, y, width, height = window_extents
-
-            display_gtk_window(
-                window_system,
-                OverlayWindow,
-                x,
-                y,
-                width,
-                height,
-                gkt_window_args=(
-                    config,
-                    hints,
-                    mouse_action,
-                ),
-                gtk_window_kwargs={
-                    "is_wayland": window_system.window_system_type
-                    == WindowSystemType.WAYLAND,
-                },
-                overlay_x_offset=config["overlay_x_offset"],
-                overlay_y_offset=config["overlay_y_offset"],
+    children = get_children(config, window_system)
+    hints = get_hints(
+        children,
+        alphabet=config.alphabet,
+    )
+    window_extents = window_system.focused_window_extents
+
+    if window_extents and hints:
+        mouse_action: dict[str, Any] = {}
+        x, y, width, height = window_extents
+
+        overlay_windows_map = {
+            "default": OverlayWindow,
+            "lean": LeanOverlayWindow,
+        }
+        overlay_window = overlay_windows_map.get(config.overlay_window)
+
+        if not overlay_window:
+            logger.warning(
+                "unknown overlay_window '%s', expected one of %s. Using 'default'.",
+                config.overlay_window,
+                ", ".join(overlay_windows_map),
             )
+            overlay_window = OverlayWindow
+
+        display_gtk_window(
+            window_system,
+            overlay_window,
+            x,
+            y,
+            width,
+            height,
+            gkt_window_args=(
+                config,
+                hints,
+                mouse_action,
+            ),
+            gtk_window_kwargs={
+                "is_wayland": window_system.window_system_type
+                == WindowSystemType.WAYLAND,
+            },
+            overlay_x_offset=config.overlay_x_offset,
+            overlay_y_offset=config.overlay_y_offset,
+        )
 
-            if mouse_action:
-
-                mouse_x_offset = 0
-                mouse_y_offset = 0
-
-                match window_system.window_system_name:
-                    case "sway":
-                        mouse_y_offset = window_system.bar_height
-
-                logger.debug("performing '%s'", mouse_action)
-
-                match mouse_action["action"]:
-                    case "click":
-                        click(
-                            mouse_action["x"] + mouse_x_offset,
-                            mouse_action["y"] + mouse_y_offset,
-                            mouse_action["button"],
-                            (MouseButtonState.DOWN, MouseButtonState.UP),
-                            mouse_action["repeat"],
-                        )
-                    case "hover":
-                        click(
-                            mouse_action["x"] + mouse_x_offset,
-                            mouse_action["y"] + mouse_y_offset,
-                            MouseButton.LEFT,
-                            (),
-                        )
-                    case "grab":
-                        click(
-                            mouse_action["x"] + mouse_x_offset,
-                            mouse_action["y"] + mouse_y_offset,
-                            MouseButton.LEFT,
-                            (MouseButtonState.DOWN,),
-                        )
-
-                        display_gtk_window(
-                            window_system,
-                            InterceptorWindow,
-                            x,
-                            y,
-                            1,
-                            1,
-                            gkt_window_args=({"action": "grab"}, config),
-                            gtk_window_kwargs={
-                                "is_wayland": window_system.window_system_type
-                                == WindowSystemType.WAYLAND,
-                            },
-                        )
-
-            # no need to use the next backend if the current one succeeded
-            break
+        if mouse_action:
+
+            mouse_x_offset = 0
+            mouse_y_offset = 0
+
+            match window_system.window_system_name:
+                case "sway":
+                    mouse_y_offset = window_system.bar_height
+
+            logger.debug("performing '%s'", mouse_action)
+
+            match mouse_action["action"]:
+                case "click":
+                    click(
+                        mouse_action["x"] + mouse_x_offset,
+                        mouse_action["y"] + mouse_y_offset,
+                        mouse_action["button"],
+                        (MouseButtonState.DOWN, MouseButtonState.UP),
+                        mouse_action["repeat"],
+                    )
+                case "hover":
+                    click(
+                        mouse_action["x"] + mouse_x_offset,
+                        mouse_action["y"] + mouse_y_offset,
+                        MouseButton.LEFT,
+                        (),
+                    )
+                case "grab":
+                    click(
+                        mouse_action["x"] + mouse_x_offset,
+                        mouse_action["y"] + mouse_y_offset,
+                        MouseButton.LEFT,
+                        (MouseButtonState.DOWN,),
+                    )
+
+                    display_gtk_window(
+                        window_system,
+                        InterceptorWindow,
+                        x,
+                        y,
+                        1,
+                        1,
+                        gkt_window_args=({"action": "grab"}, config),
+                        gtk_window_kwargs={
+                            "is_wayland": window_system.window_system_type
+                            == WindowSystemType.WAYLAND,
+                        },
+                    )
 
 
 def get_window_system_class(
@@ -284,6 +269,7 @@ def get_window_system_class(
     return window_system
 
 
+@traced("get_window_system")
 def get_window_system(window_system_id: str = "") -> Type[WindowSystem]:
     """Get window system.
 
@@ -299,21 +285,9 @@ def get_window_system(window_system_id: str = "") -> Type[WindowSystem]:
         if window_system_type == WindowSystemType.X11:
             window_system_id = "x11"
         if window_system_type == WindowSystemType.WAYLAND:
-
-            # add new waland wms here, then add a match case below to import the class
-            supported_wayland_wms = {"sway", "Hyprland", "plasmashell", "gnome-shell"}
-
-            # Check if there is a process running that matches the supported_wayland_wms
-            window_system_id = (
-                run(
-                    "ps -e -o comm | grep -m 1 -o -E "
-                    + " ".join([f"-e '^{wm}$'" for wm in supported_wayland_wms]),
-                    capture_output=True,
-                    shell=True,
-                )
-                .stdout.decode("utf-8")
-                .strip()
-            ).lower()
+            # add new wayland wms to hints.window_systems.detection, then add a
+            # match case in get_window_system_class to import the class
+            window_system_id = detect_wayland_window_system()
 
     window_system = get_window_system_class(window_system_id)
 
@@ -354,6 +328,21 @@ def main():
     parser.add_argument(
         "-s", "--setup", action="store_true", default=False, help="Guided hints setup."
     )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default="",
+        metavar="FILE",
+        help="Record latency spans (window system, gathering hints, rendering,"
+        " and mouse actions in hintsd) and write them to FILE.",
+    )
+    parser.add_argument(
+        "--trace-format",
+        type=str,
+        default="chrome",
+        choices=["chrome", "text"],
+        help="Format for --trace: Chrome trace-event JSON or a text summary.",
+    )
 
     args = parser.parse_args()
 
@@ -368,9 +357,30 @@ def main():
     else:
         logging.basicConfig(level=logging.INFO, format=custom_format)
 
-    window_system = get_window_system(config["window_system"])()
+    if args.trace:
+        tracer.enable()
+
+    try:
+        with tracer.span("main", mode=args.mode):
+            run_mode(args.mode, config)
+    finally:
+        if args.trace:
+            logger.debug(tracer.summary())
+            tracer.export(args.trace, args.trace_format)
+
+
+def run_mode(mode: str, config: HintsConfig):
+    """Run a hints mode.
+
+    :param mode: The mode to run.
+    :param config: Hints config.
+    """
+    window_system_class = get_window_system(config.window_system)
+
+    with tracer.span("window_system_init"):
+        window_system = window_system_class(config)
 
-    match args.mode:
+    match mode:
         case "hint":
             hint_mode(config, window_system)
         case "scroll":
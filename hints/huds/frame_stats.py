@@ -0,0 +1,171 @@
+"""Opt-in frame-time and input-latency instrumentation for hints HUDs.
+
+Timings are taken from the GdkFrameClock (and the same monotonic clock
+through GLib) so they line up with the frames GTK paints.
+Samples are summarized as histograms when the process exits and can
+optionally be written to a JSON file to track rendering regressions.
+"""
+
+from __future__ import annotations
+
+import logging
+from atexit import register
+from json import dump
+from typing import TYPE_CHECKING, Any
+
+from gi import require_version
+
+require_version("Gdk", "3.0")
+from gi.repository import GLib
+
+if TYPE_CHECKING:
+    from gi.repository import Gdk, Gtk
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (in milliseconds) for histogram buckets, the last bucket
+# collects everything above the last bound.
+HISTOGRAM_BUCKETS_MS = (1, 2, 4, 8, 16.7, 33.3, 66.7, 100, 250)
+
+
+class FrameStats:
+    """Collect timing samples for HUD windows."""
+
+    def __init__(self):
+        self.enabled = False
+        self.output_file = ""
+        self.samples: dict[str, list[float]] = {}
+        self._pending_key_press_time: dict[str, int] = {}
+        self._show_time: dict[str, int] = {}
+
+    def enable(self, output_file: str = ""):
+        """Enable instrumentation.
+
+        :param output_file: Optional JSON file to write the summary to
+            on exit.
+        """
+        if not self.enabled:
+            register(self.export)
+
+        self.enabled = True
+        self.output_file = output_file
+
+    def record(self, metric: str, value: float):
+        """Record a sample for a metric.
+
+        :param metric: Name of the metric.
+        :param value: Sample value.
+        """
+        if self.enabled:
+            self.samples.setdefault(metric, []).append(value)
+
+    def attach(self, name: str, widget: Gtk.Widget):
+        """Track first frame and key-to-paint latency for a widget.
+
+        :param name: Name used to prefix the metrics for the widget.
+        :param widget: The widget to track (must not be realized yet).
+        """
+        if not self.enabled:
+            return
+
+        def on_show(*_):
+            self._show_time[name] = GLib.get_monotonic_time()
+
+        def on_realize(*_):
+            widget.get_frame_clock().connect("after-paint", on_after_paint)
+
+        def on_after_paint(frame_clock: Gdk.FrameClock):
+            now = GLib.get_monotonic_time()
+
+            if name in self._show_time:
+                self.record(
+                    f"{name}.show_to_first_frame_ms",
+                    (now - self._show_time.pop(name)) / 1000,
+                )
+
+            if name in self._pending_key_press_time:
+                self.record(
+                    f"{name}.key_to_paint_ms",
+                    (now - self._pending_key_press_time.pop(name)) / 1000,
+                )
+
+            self.record(
+                f"{name}.frame_paint_ms",
+                (now - frame_clock.get_frame_time()) / 1000,
+            )
+
+        widget.connect("show", on_show)
+        widget.connect("realize", on_realize)
+
+    def mark_key_press(self, name: str):
+        """Mark the time of a key press that will result in a repaint.
+
+        :param name: Name of the widget handling the key press.
+        """
+        if self.enabled:
+            self._pending_key_press_time[name] = GLib.get_monotonic_time()
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Summarize samples.
+
+        :return: Summary statistics and histogram for each metric.
+        """
+        summary = {}
+
+        for metric, values in self.samples.items():
+            ordered = sorted(values)
+
+            summary[metric] = {
+                "count": len(ordered),
+                "min": ordered[0],
+                "p50": ordered[len(ordered) // 2],
+                "p90": ordered[int(len(ordered) * 0.9)],
+                "p99": ordered[int(len(ordered) * 0.99)],
+                "max": ordered[-1],
+            }
+
+            # only timings get a histogram, counts (like hint counts) don't
+            # fit the millisecond buckets.
+            if metric.endswith("_ms"):
+                histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+                for value in ordered:
+                    bucket = len(HISTOGRAM_BUCKETS_MS)
+                    for index, upper_bound in enumerate(HISTOGRAM_BUCKETS_MS):
+                        if value <= upper_bound:
+                            bucket = index
+                            break
+                    histogram[bucket] += 1
+
+                summary[metric]["histogram"] = dict(
+                    zip(
+                        [f"<={bound}" for bound in HISTOGRAM_BUCKETS_MS]
+                        + [f">{HISTOGRAM_BUCKETS_MS[-1]}"],
+                        histogram,
+                    )
+                )
+
+        return summary
+
+    def export(self):
+        """Log the summary and write it to the output file if set."""
+        summary = self.summary()
+
+        for metric, stats in summary.items():
+            logger.info(
+                "%s: n=%d min=%.2f p50=%.2f p90=%.2f p99=%.2f max=%.2f",
+                metric,
+                stats["count"],
+                stats["min"],
+                stats["p50"],
+                stats["p90"],
+                stats["p99"],
+                stats["max"],
+            )
+
+        if self.output_file:
+            with open(self.output_file, "w", encoding="utf-8") as _f:
+                dump(summary, _f, indent=2)
+
+
+frame_stats = FrameStats()
@@ -12,11 +12,13 @@ listening for.
 
 from __future__ import annotations
 
+from time import perf_counter
 from typing import Any
 
 from gi import require_foreign, require_version
 
-from hints.mouse import click, do_mouse_action, move
+from hints.huds.frame_stats import frame_stats
+from hints.mouse import click, key_down, key_up, move
 from hints.mouse_enums import MouseButton, MouseButtonState, MouseMode
 from hints.utils import HintsConfig
 
@@ -55,7 +57,9 @@ class InterceptorWindow(Gtk.Window):
         self.height = height
         self.mouse_action = mouse_action
         self.config = config
-        self.key_press_state: dict[str, Any] = {}
+        # keys moving / scrolling the mouse, hintsd keeps doing so until they
+        # are released so key repeats are ignored.
+        self.held_keys: set[int] = set()
         self.is_wayland = is_wayland
         self.first_move = True
 
@@ -75,15 +79,23 @@ class InterceptorWindow(Gtk.Window):
         self.connect("destroy", Gtk.main_quit)
         self.connect("key-press-event", self.on_key_press)
         self.connect("key-release-event", self.on_key_release)
+        # key releases are not sent to the window once it loses the keyboard,
+        # so hintsd would keep moving the mouse for keys held at that point.
+        self.connect("focus-out-event", self.release_held_keys)
+        self.connect("grab-broken-event", self.release_held_keys)
         self.connect("show", self.on_grab)
 
-    def on_key_release(self, *_):
-        """Handle key releases."""
-        self.key_press_state.clear()
+        instrumentation_config = config.instrumentation
+        if instrumentation_config.enable:
+            frame_stats.enable(instrumentation_config.output_file)
+            frame_stats.attach("interceptor", self)
 
-    def on_key_press(self, _, event):
-        """Handle key presses :param event: Event object."""
+    def get_keyval(self, event) -> int:
+        """Get the lowercase keyval for a key event.
 
+        :param event: Event object.
+        :return: The keyval.
+        """
         keymap = Gdk.Keymap.get_for_display(Gdk.Display.get_default())
 
         # if keyval is bound, keyval, effective_group, level, consumed_modifiers
@@ -93,9 +105,30 @@ class InterceptorWindow(Gtk.Window):
             1,
         )
 
-        keyval_lower = Gdk.keyval_to_lower(keyval)
+        return Gdk.keyval_to_lower(keyval)
+
+    def release_held_keys(self, *_):
+        """Stop moving / scrolling the mouse for every held key."""
+        for keyval in self.held_keys:
+            key_up(chr(keyval))
+        self.held_keys.clear()
+
+    def on_key_release(self, _, event):
+        """Handle key releases :param event: Event object."""
+        keyval_lower = self.get_keyval(event)
+
+        if keyval_lower in self.held_keys:
+            self.held_keys.remove(keyval_lower)
+            key_up(chr(keyval_lower))
 
-        if keyval_lower == self.config["exit_key"]:
+    def on_key_press(self, _, event):
+        """Handle key presses :param event: Event object."""
+        key_press_start = perf_counter()
+
+        keyval_lower = self.get_keyval(event)
+
+        if keyval_lower == self.config.exit_key:
+            self.release_held_keys()
             click(0, 0, MouseButton.LEFT, (MouseButtonState.UP,), absolute=False)
             Gtk.main_quit()
 
@@ -107,20 +140,20 @@ class InterceptorWindow(Gtk.Window):
             move(0, -1, absolute=False)
             self.first_move = False
 
-        if keyval_lower:
+        if keyval_lower and keyval_lower not in self.held_keys:
             match self.mouse_action["action"]:
                 case "grab":
-                    self.key_press_state = do_mouse_action(
-                        self.key_press_state,
-                        chr(keyval_lower),
-                        MouseMode.MOVE,
-                    )
+                    key_down(chr(keyval_lower), MouseMode.MOVE)
+                    self.held_keys.add(keyval_lower)
                 case "scroll":
-                    self.key_press_state = do_mouse_action(
-                        self.key_press_state,
-                        chr(keyval_lower),
-                        MouseMode.SCROLL,
-                    )
+                    key_down(chr(keyval_lower), MouseMode.SCROLL)
+                    self.held_keys.add(keyval_lower)
+
+        # the interceptor does not repaint on key presses, so the latency we
+        # care about is how long it takes the mouse action to be performed.
+        frame_stats.record(
+            "interceptor.key_to_action_ms", (perf_counter() - key_press_start) * 1000
+        )
 
     def on_grab(self, window):
         """Force keyboard grab to listen for keybaord events.
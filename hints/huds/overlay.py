@@ -2,17 +2,19 @@
 
 from __future__ import annotations
 
+from time import perf_counter
 from typing import TYPE_CHECKING, Any
 
 from gi import require_foreign, require_version
 
+from hints.huds.frame_stats import frame_stats
 from hints.mouse_enums import MouseButton
 from hints.utils import HintsConfig
 
 require_version("Gdk", "3.0")
 require_version("Gtk", "3.0")
 require_foreign("cairo")
-from cairo import FONT_SLANT_NORMAL, FONT_WEIGHT_BOLD
+from cairo import FONT_SLANT_NORMAL, FONT_WEIGHT_BOLD, Region
 from gi.repository import Gdk, Gtk
 
 if TYPE_CHECKING:
@@ -55,32 +57,32 @@ class OverlayWindow(Gtk.Window):
         self.is_wayland = is_wayland
 
         # hint settings
-        hints_config = config["hints"]
-        self.hint_height = hints_config["hint_height"]
-        self.hint_width_padding = hints_config["hint_width_padding"]
-
-        self.hint_font_size = hints_config["hint_font_size"]
-        self.hint_font_face = hints_config["hint_font_face"]
-        self.hint_font_r = hints_config["hint_font_r"]
-        self.hint_font_g = hints_config["hint_font_g"]
-        self.hint_font_b = hints_config["hint_font_b"]
-        self.hint_font_a = hints_config["hint_font_a"]
-
-        self.hint_pressed_font_r = hints_config["hint_pressed_font_r"]
-        self.hint_pressed_font_g = hints_config["hint_pressed_font_g"]
-        self.hint_pressed_font_b = hints_config["hint_pressed_font_b"]
-        self.hint_pressed_font_a = hints_config["hint_pressed_font_a"]
-        self.hint_upercase = hints_config["hint_upercase"]
-
-        self.hint_background_r = hints_config["hint_background_r"]
-        self.hint_background_g = hints_config["hint_background_g"]
-        self.hint_background_b = hints_config["hint_background_b"]
-        self.hint_background_a = hints_config["hint_background_a"]
+        hints_config = config.hints
+        self.hint_height = hints_config.hint_height
+        self.hint_width_padding = hints_config.hint_width_padding
+
+        self.hint_font_size = hints_config.hint_font_size
+        self.hint_font_face = hints_config.hint_font_face
+        self.hint_font_r = hints_config.hint_font_r
+        self.hint_font_g = hints_config.hint_font_g
+        self.hint_font_b = hints_config.hint_font_b
+        self.hint_font_a = hints_config.hint_font_a
+
+        self.hint_pressed_font_r = hints_config.hint_pressed_font_r
+        self.hint_pressed_font_g = hints_config.hint_pressed_font_g
+        self.hint_pressed_font_b = hints_config.hint_pressed_font_b
+        self.hint_pressed_font_a = hints_config.hint_pressed_font_a
+        self.hint_upercase = hints_config.hint_upercase
+
+        self.hint_background_r = hints_config.hint_background_r
+        self.hint_background_g = hints_config.hint_background_g
+        self.hint_background_b = hints_config.hint_background_b
+        self.hint_background_a = hints_config.hint_background_a
 
         # key settings
-        self.exit_key = config["exit_key"]
-        self.hover_modifier = config["hover_modifier"]
-        self.grab_modifier = config["grab_modifier"]
+        self.exit_key = config.exit_key
+        self.hover_modifier = config.hover_modifier
+        self.grab_modifier = config.grab_modifier
 
         self.hints_drawn_offsets: dict[str, tuple[float, float]] = {}
 
@@ -97,12 +99,26 @@ class OverlayWindow(Gtk.Window):
         self.set_default_size(self.width, self.height)
         self.move(x_pos, y_pos)
 
-        self.drawing_area = Gtk.DrawingArea()
-
         self.connect("destroy", Gtk.main_quit)
         self.connect("key-press-event", self.on_key_press)
         self.connect("show", self.on_show)
-        self.drawing_area.connect("draw", self.on_draw)
+
+        self.current_snippet = None
+
+        self.drawing_area = self.setup_drawing_area()
+
+        instrumentation_config = config.instrumentation
+        if instrumentation_config.enable:
+            frame_stats.enable(instrumentation_config.output_file)
+            frame_stats.attach("overlay", self.drawing_area)
+
+    def setup_drawing_area(self) -> Gtk.Widget:
+        """Setup the widget hints are drawn on.
+
+        :return: The widget to queue draws on when hints change.
+        """
+        drawing_area = Gtk.DrawingArea()
+        drawing_area.connect("draw", self.on_draw)
 
         def put_in_frame(widget):
             frame = Gtk.Frame(label=None)
@@ -110,17 +126,18 @@ class OverlayWindow(Gtk.Window):
             frame.add(widget)
             return frame
 
-        self.current_snippet = None
-
         vpaned = Gtk.VPaned()
         self.add(vpaned)
-        vpaned.pack1(put_in_frame(self.drawing_area), True, True)
+        vpaned.pack1(put_in_frame(drawing_area), True, True)
+
+        return drawing_area
 
     def on_draw(self, _, cr: Context):
         """Draw hints.
 
         :param cr: Cairo Context.
         """
+        draw_start = perf_counter()
         hint_height = self.hint_height
 
         cr.select_font_face(self.hint_font_face, FONT_SLANT_NORMAL, FONT_WEIGHT_BOLD)
@@ -193,6 +210,9 @@ class OverlayWindow(Gtk.Window):
                 cr.close_path()
                 cr.restore()
 
+        frame_stats.record("overlay.draw_ms", (perf_counter() - draw_start) * 1000)
+        frame_stats.record("overlay.hint_count", len(self.hints))
+
     def update_hints(self, next_char: str):
         """Update hints on screen to eliminate options.
 
@@ -213,6 +233,7 @@ class OverlayWindow(Gtk.Window):
 
     def on_key_press(self, _, event):
         """Handle key presses :param event: Event object."""
+        frame_stats.mark_key_press("overlay")
         keymap = Gdk.Keymap.get_for_display(Gdk.Display.get_default())
 
         # if keyval is bound, keyval, effective_group, level, consumed_modifiers
@@ -287,3 +308,33 @@ class OverlayWindow(Gtk.Window):
             self.get_window(),  # Gdk Window object
             Gdk.Cursor.new_from_name(Gdk.Display.get_default(), "none"),
         )
+
+
+class LeanOverlayWindow(OverlayWindow):
+    """Overlay that draws hints directly on the toplevel window.
+
+    This skips the DrawingArea/Frame/VPaned hierarchy used by
+    OverlayWindow, so there are no extra size allocation passes or frame
+    shadows, and the window does not take any pointer input since hints
+    are only interacted with using the keyboard.
+    """
+
+    def setup_drawing_area(self) -> Gtk.Widget:
+        """Draw on the toplevel window itself.
+
+        :return: The widget to queue draws on when hints change.
+        """
+        self.connect("draw", self.on_draw)
+        self.connect("realize", self.on_realize)
+
+        return self
+
+    def on_realize(self, window):
+        """Limit the input region once the Gdk window exists.
+
+        An empty input shape lets pointer events pass through to the
+        window underneath. Keyboard events are unaffected.
+
+        :param window: Gtk Window object.
+        """
+        window.input_shape_combine_region(Region())
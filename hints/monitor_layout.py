@@ -0,0 +1,152 @@
+"""Monitor layout.
+
+The layout is built from the Gdk display's monitors, with their geometry
+(in logical pixels, the coordinate space windows and hints use) and
+scale factor, and is kept current as monitors are added, removed or
+change.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from gi import require_version
+
+require_version("Gdk", "3.0")
+from gi.repository import Gdk
+
+logger = logging.getLogger(__name__)
+
+
+class Monitor:
+    """A monitor in the layout."""
+
+    def __init__(
+        self, x: int, y: int, width: int, height: int, scale_factor: int, model: str
+    ):
+        """Monitor constructor.
+
+        :param x: X position in the layout.
+        :param y: Y position in the layout.
+        :param width: Width in logical pixels.
+        :param height: Height in logical pixels.
+        :param scale_factor: Scale factor.
+        :param model: Monitor model name.
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.scale_factor = scale_factor
+        self.model = model
+
+    def contains(self, x: float, y: float) -> bool:
+        """Check if a position is on the monitor.
+
+        :param x: X position.
+        :param y: Y position.
+        :return: Whether the position is on the monitor.
+        """
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+
+class MonitorLayout:
+    """Layout of the display's monitors."""
+
+    def __init__(self, display: Gdk.Display | None = None):
+        """Monitor layout constructor.
+
+        :param display: Display to get monitors from, the default
+            display if not given.
+        """
+        self.display = display or Gdk.Display.get_default()
+        self.monitors: list[Monitor] = []
+        self._monitor_handlers: list[tuple[Gdk.Monitor, int]] = []
+        self.update()
+
+    def watch(self):
+        """Keep the layout current as monitors are added, removed or
+        change."""
+        self.display.connect("monitor-added", self.on_monitors_changed)
+        self.display.connect("monitor-removed", self.on_monitors_changed)
+        self._watch_monitors()
+
+    def _watch_monitors(self):
+        """Watch every monitor for geometry and scale factor changes."""
+        for gdk_monitor, handler_id in self._monitor_handlers:
+            gdk_monitor.disconnect(handler_id)
+
+        self._monitor_handlers = []
+        for index in range(self.display.get_n_monitors()):
+            gdk_monitor = self.display.get_monitor(index)
+            for signal_name in ("notify::geometry", "notify::scale-factor"):
+                self._monitor_handlers.append(
+                    (
+                        gdk_monitor,
+                        gdk_monitor.connect(signal_name, self.on_monitors_changed),
+                    )
+                )
+
+    def on_monitors_changed(self, *_):
+        """Rebuild the layout when monitors change."""
+        self._watch_monitors()
+        self.update()
+
+    def update(self):
+        """Rebuild the layout from the display's monitors."""
+        monitors = []
+
+        for index in range(self.display.get_n_monitors()):
+            gdk_monitor = self.display.get_monitor(index)
+            geometry = gdk_monitor.get_geometry()
+            monitors.append(
+                Monitor(
+                    geometry.x,
+                    geometry.y,
+                    geometry.width,
+                    geometry.height,
+                    gdk_monitor.get_scale_factor(),
+                    gdk_monitor.get_model() or "",
+                )
+            )
+
+        self.monitors = monitors
+        logger.debug(
+            "Monitor layout: %s",
+            [
+                (monitor.model, monitor.x, monitor.y, monitor.width, monitor.height)
+                for monitor in monitors
+            ],
+        )
+
+    @property
+    def bounds(self) -> tuple[int, int, int, int]:
+        """Get the bounding box of every monitor.
+
+        Monitors can be offset from each other and the layout can start
+        at negative positions.
+
+        :return: Bounds (x, y, width, height).
+        """
+        if not self.monitors:
+            return 0, 0, 1, 1
+
+        left = min(monitor.x for monitor in self.monitors)
+        top = min(monitor.y for monitor in self.monitors)
+        right = max(monitor.x + monitor.width for monitor in self.monitors)
+        bottom = max(monitor.y + monitor.height for monitor in self.monitors)
+
+        return left, top, right - left, bottom - top
+
+    def monitor_at(self, x: float, y: float) -> Monitor | None:
+        """Get the monitor at a position.
+
+        :param x: X position.
+        :param y: Y position.
+        :return: The monitor, None if the position is off every monitor.
+        """
+        for monitor in self.monitors:
+            if monitor.contains(x, y):
+                return monitor
+
+        return None
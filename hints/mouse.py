@@ -4,17 +4,27 @@ This module is a skeleton and does not contain any of the mouse logic.
 The mouse logic lives in mouse_service.py. This module communicates with
 the hintsd service via a Unix Domain Socket for Interprocess
 Communication.
+
+The connection to hintsd is kept open for the lifetime of the process
+so that repeated actions (ex: moving the mouse while a key is held) do
+not pay for connecting every time.
 """
 
 from __future__ import annotations
 
-from pickle import dumps, loads
 from socket import AF_UNIX, SOCK_STREAM, socket
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING
 
 from hints.constants import SOCKET_MESSAGE_SIZE, UNIX_DOMAIN_SOCKET_FILE
-
-KEY_PRESS_STATE: dict[str, Any] = {}
+from hints.mouse_protocol import (
+    MAX_CLICK_REPEAT,
+    FrameDecoder,
+    Opcode,
+    decode_response,
+    encode_frame,
+    encode_request,
+)
+from hints.tracing import tracer
 
 if TYPE_CHECKING:
     from hints.mouse_enums import MouseButton, MouseButtonState, MouseMode
@@ -27,28 +37,129 @@ class CouldNotCommunicateWithTheMouseService(Exception):
         return "Could not communicate with the hintsd service. Is it running?"
 
 
-def send_message(method: str, *args, **kwargs) -> Any:
+class MouseServiceConnection:
+    """Persistent connection to the mouse service.
+
+    Requests are sent with an id and responses are matched to them by
+    id, so several requests can be in flight at once. If the connection
+    is found closed when sending (ex: hintsd restarted), it is
+    re-established and the request sent again.
+    """
+
+    def __init__(self, socket_file: str = UNIX_DOMAIN_SOCKET_FILE):
+        """Mouse service connection constructor.
+
+        :param socket_file: Unix Domain Socket file of the mouse service.
+        """
+        self.socket_file = socket_file
+        self.client: socket | None = None
+        self.decoder = FrameDecoder()
+        self.next_request_id = 0
+        self.responses: dict[int, bytes] = {}
+
+    def connect(self):
+        """Connect to the mouse service.
+
+        :raises CouldNotCommunicateWithTheMouseService: When the mouse
+            service is not listening.
+        """
+        self.close()
+        client = socket(AF_UNIX, SOCK_STREAM)
+
+        try:
+            client.connect(self.socket_file)
+        except OSError as error:
+            client.close()
+            raise CouldNotCommunicateWithTheMouseService() from error
+
+        self.client = client
+        self.decoder = FrameDecoder()
+
+    def close(self):
+        """Close the connection, dropping any requests in flight."""
+        if self.client:
+            self.client.close()
+            self.client = None
+        self.responses.clear()
+
+    def request(self, payload: bytes) -> int:
+        """Send a request without waiting for its response.
+
+        :param payload: Encoded request.
+        :return: Id of the request, to get its response with response.
+        :raises CouldNotCommunicateWithTheMouseService: When the mouse
+            service could not be reached.
+        """
+        self.next_request_id = (self.next_request_id + 1) % 2**32
+        frame = encode_frame(self.next_request_id, payload)
+
+        if not self.client:
+            self.connect()
+
+        try:
+            self.client.sendall(frame)
+        except OSError:
+            # the mouse service closed the connection, it never got this
+            # request so it is safe to send it again.
+            self.connect()
+            try:
+                self.client.sendall(frame)
+            except OSError as error:
+                self.close()
+                raise CouldNotCommunicateWithTheMouseService() from error
+
+        return self.next_request_id
+
+    def response(self, request_id: int) -> bytes:
+        """Wait for the response to a request.
+
+        Responses to other requests received meanwhile are kept until
+        they are asked for.
+
+        :param request_id: Id of the request.
+        :return: The encoded response.
+        :raises CouldNotCommunicateWithTheMouseService: When the
+            connection is closed before the response arrives.
+        """
+        while request_id not in self.responses:
+            try:
+                data = self.client.recv(SOCKET_MESSAGE_SIZE) if self.client else b""
+            except OSError:
+                data = b""
+
+            if not data:
+                self.close()
+                raise CouldNotCommunicateWithTheMouseService()
+
+            for response_id, payload in self.decoder.feed(data):
+                self.responses[response_id] = payload
+
+        return self.responses.pop(request_id)
+
+
+connection = MouseServiceConnection()
+
+
+def send_message(opcode: Opcode, fields: tuple, extra: bytes = b""):
     """Send message to hint-mouse service.
 
-    :param method: The name of the method to call.
-    :param args: args for the method.
-    :param kwargs: kwargs for the method.
-    :param return: The payload sent back from the mouse service.
-    :raises CouldNotCommunicateWithTheMouseService: When the sock file
-        does not exist (the mouse service creates this file).
+    :param opcode: Opcode of the request.
+    :param fields: The opcode's fixed fields.
+    :param extra: The opcode's variable part.
+    :raises CouldNotCommunicateWithTheMouseService: When the mouse
+        service could not be reached.
     """
-    with socket(AF_UNIX, SOCK_STREAM) as client:
-        client.connect(UNIX_DOMAIN_SOCKET_FILE)
-        client.sendall(
-            dumps(
-                {
-                    "method": method,
-                    "args": args,
-                    "kwargs": kwargs,
-                }
-            )
-        )
-        return loads(client.recv(SOCKET_MESSAGE_SIZE))
+    # when tracing, the mouse service replies with the spans it recorded for
+    # the request.
+    payload = encode_request(
+        opcode, fields, extra, tracer.trace_id if tracer.enabled else ""
+    )
+
+    with tracer.span(f"mouse.{opcode.name.lower()}"):
+        spans = decode_response(connection.response(connection.request(payload)))
+
+    if spans:
+        tracer.add_spans(spans)
 
 
 def scroll(x: int, y: int, *_args, **_kwargs):
@@ -59,10 +170,10 @@ def scroll(x: int, y: int, *_args, **_kwargs):
         same interface as move. :param **_kwargs: Extra kwargs to use
         the same interface as move.
     """
-    send_message("scroll", x, y, *_args, **_kwargs)
+    send_message(Opcode.SCROLL, (x, y))
 
 
-def move(x: int, y: int, absolute: bool = True):
+def move(x: float, y: float, absolute: bool = True):
     """Move event.
 
     :param X: X move direction.
@@ -70,13 +181,12 @@ def move(x: int, y: int, absolute: bool = True):
     :param absolute: Whether to move the mouse using an absolute
         position.
     """
-
-    send_message("move", x, y, absolute=absolute)
+    send_message(Opcode.MOVE, (x, y, absolute))
 
 
 def click(
-    x: int,
-    y: int,
+    x: float,
+    y: float,
     button: MouseButton,
     button_states: Iterable[MouseButtonState],
     repeat: int = 1,
@@ -89,30 +199,28 @@ def click(
     :param button: Button to use for click.
     :param actions: Actions to use for the click button (button down /
         button up).
-    :param repeat: Times to repeat a click.
+    :param repeat: Times to repeat a click, at most MAX_CLICK_REPEAT.
     :param absolute: Whether the click position is absolute.
     """
     send_message(
-        "click",
-        x,
-        y,
-        button.value,
-        [button_state.value for button_state in button_states],
-        repeat=repeat,
-        absolute=absolute,
+        Opcode.CLICK,
+        (x, y, button.value, min(repeat, MAX_CLICK_REPEAT), absolute),
+        bytes(button_state.value for button_state in button_states),
     )
 
 
-def do_mouse_action(
-    key_press_state: dict[str, Any],
-    key: str,
-    mode: MouseMode,
-):
-    """Perform mouse action.
+def key_down(key: str, mode: MouseMode):
+    """Start moving or scrolling the mouse for a key until key_up.
 
-    :param key_press_state: State containing key press event data used
-        for ramping up speeds.
-    :param key: The key to perform a mouse action for.
+    :param key: The key that went down.
     :param mode: The mouse mode.
     """
-    return send_message("do_mouse_action", key_press_state, key, mode.value)
+    send_message(Opcode.KEY_DOWN, (ord(key), mode.value))
+
+
+def key_up(key: str):
+    """Stop moving or scrolling the mouse for a key.
+
+    :param key: The key that went up.
+    """
+    send_message(Opcode.KEY_UP, (ord(key),))
@@ -0,0 +1,243 @@
+"""Protocol between hints and the hintsd mouse service.
+
+Both sides keep a connection open and exchange frames made of a fixed
+header, holding the payload length and a request id, followed by the
+payload. Request ids let a client have several requests in flight on
+one connection and match responses to them.
+
+Payloads are packed with struct, nothing sent to hintsd is unpickled.
+A request is a header (protocol version, opcode and trace id length),
+the trace id, the opcode's fixed fields and, for some opcodes, a
+variable part (the button states of a click). A response is a header
+(protocol version and flags) followed by the spans recorded by hintsd,
+if its flag is set.
+"""
+
+from __future__ import annotations
+
+from enum import IntEnum
+from json import dumps, loads
+from math import isfinite
+from struct import Struct, error
+from typing import Any
+
+PROTOCOL_VERSION = 3
+
+# payload length, request id
+HEADER = Struct("!II")
+MAX_PAYLOAD_SIZE = 2**20
+
+
+class ProtocolError(Exception):
+    """Exception to raise when a peer sends a malformed message."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+    def __str__(self):
+        return f"Malformed mouse service message: {self.reason}."
+
+
+def encode_frame(request_id: int, payload: bytes) -> bytes:
+    """Encode a frame.
+
+    :param request_id: Id of the request the payload is for.
+    :param payload: Payload.
+    :return: The frame.
+    """
+    return HEADER.pack(len(payload), request_id) + payload
+
+
+class FrameDecoder:
+    """Incremental frame decoder for a stream."""
+
+    def __init__(self):
+        """Frame decoder constructor."""
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[tuple[int, bytes]]:
+        """Add data read from the stream.
+
+        :param data: Data read from the stream.
+        :return: Request ids and payloads of the frames completed by the
+            data.
+        :raises ProtocolError: When a frame is larger than
+            MAX_PAYLOAD_SIZE.
+        """
+        self.buffer += data
+        frames = []
+
+        while len(self.buffer) >= HEADER.size:
+            payload_size, request_id = HEADER.unpack_from(self.buffer)
+
+            if payload_size > MAX_PAYLOAD_SIZE:
+                raise ProtocolError(f"payload of {payload_size} bytes")
+
+            frame_size = HEADER.size + payload_size
+            if len(self.buffer) < frame_size:
+                break
+
+            frames.append((request_id, bytes(self.buffer[HEADER.size : frame_size])))
+            del self.buffer[:frame_size]
+
+        return frames
+
+
+class Opcode(IntEnum):
+    """Request opcodes."""
+
+    MOVE = 1
+    CLICK = 2
+    SCROLL = 3
+    KEY_DOWN = 4
+    KEY_UP = 5
+
+
+# protocol version, opcode, trace id length
+REQUEST_HEADER = Struct("!BBB")
+# positions are doubles, hints computes them from hint offsets and scale
+# factors, and hintsd maps them to pixels.
+REQUEST_FIELDS = {
+    # x, y, absolute
+    Opcode.MOVE: Struct("!dd?"),
+    # x, y, button, repeat, absolute, followed by one byte per button state
+    Opcode.CLICK: Struct("!ddHH?"),
+    # x, y
+    Opcode.SCROLL: Struct("!ii"),
+    # key (code point), mouse mode
+    Opcode.KEY_DOWN: Struct("!IB"),
+    # key (code point)
+    Opcode.KEY_UP: Struct("!I"),
+}
+# hintsd clicks (and sleeps between clicks) repeat times, so a request
+# cannot keep it busy for longer than this many clicks.
+MAX_CLICK_REPEAT = 100
+# values of hints.mouse_enums.MouseMode and MouseButtonState, which are not
+# imported as that module needs evdev.
+MOUSE_MODES = (1, 2)
+BUTTON_STATES = (0, 1)
+# keys are sent as Unicode code points
+MAX_CODE_POINT = 0x10FFFF
+
+# protocol version, flags
+RESPONSE_HEADER = Struct("!BB")
+RESPONSE_SPANS = 1
+
+
+def encode_request(
+    opcode: Opcode, fields: tuple, extra: bytes = b"", trace_id: str = ""
+) -> bytes:
+    """Encode a request.
+
+    :param opcode: Opcode of the request.
+    :param fields: The opcode's fixed fields.
+    :param extra: The opcode's variable part.
+    :param trace_id: Trace id, when tracing.
+    :return: The encoded request.
+    """
+    encoded_trace_id = trace_id.encode()
+
+    return (
+        REQUEST_HEADER.pack(PROTOCOL_VERSION, opcode, len(encoded_trace_id))
+        + encoded_trace_id
+        + REQUEST_FIELDS[opcode].pack(*fields)
+        + extra
+    )
+
+
+def decode_request(payload: bytes) -> tuple[Opcode, tuple, bytes, str]:
+    """Decode a request.
+
+    :param payload: The encoded request.
+    :return: Opcode, fixed fields, variable part and trace id.
+    :raises ProtocolError: When the request is malformed or uses an
+        unsupported protocol version.
+    """
+    try:
+        version, opcode, trace_id_size = REQUEST_HEADER.unpack_from(payload)
+
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError(f"unsupported protocol version {version}")
+
+        opcode = Opcode(opcode)
+        offset = REQUEST_HEADER.size + trace_id_size
+        trace_id = payload[REQUEST_HEADER.size : offset].decode()
+        fields = REQUEST_FIELDS[opcode].unpack_from(payload, offset)
+    except (error, ValueError) as decode_error:
+        raise ProtocolError(str(decode_error)) from decode_error
+
+    extra = payload[offset + REQUEST_FIELDS[opcode].size :]
+    check_request(opcode, fields, extra)
+
+    return opcode, fields, extra, trace_id
+
+
+def check_request(opcode: Opcode, fields: tuple, extra: bytes):
+    """Check the values of a decoded request.
+
+    :param opcode: Opcode of the request.
+    :param fields: The opcode's fixed fields.
+    :param extra: The opcode's variable part.
+    :raises ProtocolError: When a value is out of range.
+    """
+    if opcode in (Opcode.MOVE, Opcode.CLICK) and not (
+        isfinite(fields[0]) and isfinite(fields[1])
+    ):
+        raise ProtocolError(f"position ({fields[0]}, {fields[1]}) is not finite")
+
+    if opcode == Opcode.CLICK:
+        if fields[3] > MAX_CLICK_REPEAT:
+            raise ProtocolError(
+                f"click repeat {fields[3]} is over the maximum of {MAX_CLICK_REPEAT}"
+            )
+        if any(state not in BUTTON_STATES for state in extra):
+            raise ProtocolError(f"unknown button states {list(extra)}")
+
+    if opcode in (Opcode.KEY_DOWN, Opcode.KEY_UP):
+        if fields[0] > MAX_CODE_POINT:
+            raise ProtocolError(f"key {fields[0]:#x} is not a code point")
+
+    if opcode == Opcode.KEY_DOWN and fields[1] not in MOUSE_MODES:
+        raise ProtocolError(f"unknown mouse mode {fields[1]}")
+
+
+def encode_response(spans: list[dict[str, Any]] | None = None) -> bytes:
+    """Encode a response.
+
+    :param spans: Spans recorded for the request, when tracing.
+    :return: The encoded response.
+    """
+    flags = 0
+    body = b""
+
+    if spans is not None:
+        flags |= RESPONSE_SPANS
+        body += dumps(spans).encode()
+
+    return RESPONSE_HEADER.pack(PROTOCOL_VERSION, flags) + body
+
+
+def decode_response(payload: bytes) -> list[dict[str, Any]] | None:
+    """Decode a response.
+
+    :param payload: The encoded response.
+    :return: Spans, None when not in the response.
+    :raises ProtocolError: When the response is malformed or uses an
+        unsupported protocol version.
+    """
+    try:
+        version, flags = RESPONSE_HEADER.unpack_from(payload)
+    except error as struct_error:
+        raise ProtocolError(str(struct_error)) from struct_error
+
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported protocol version {version}")
+
+    if not flags & RESPONSE_SPANS:
+        return None
+
+    try:
+        return loads(payload[RESPONSE_HEADER.size :])
+    except ValueError as decode_error:
+        raise ProtocolError(str(decode_error)) from decode_error
@@ -9,41 +9,229 @@ process when creating virutal devices.
 
 from __future__ import annotations
 
+import logging
 import socket
+from collections import deque
+from functools import partial
 from os import path, remove
-from pickle import dumps, loads
-from signal import SIGINT, signal
-from time import sleep, time
-from typing import TYPE_CHECKING, Any, Iterable
+from signal import SIGINT
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
 
 from evdev import AbsInfo, UInput, ecodes
 from gi import require_version
 
 from hints.constants import SOCKET_MESSAGE_SIZE, UNIX_DOMAIN_SOCKET_FILE
+from hints.monitor_layout import MonitorLayout
 from hints.mouse_enums import MouseButton, MouseMode
-from hints.utils import load_config
+from hints.mouse_protocol import (
+    FrameDecoder,
+    Opcode,
+    ProtocolError,
+    decode_request,
+    encode_frame,
+    encode_response,
+)
+from hints.tracing import Tracer
+from hints.utils import load_config, watch_config
 
 require_version("Gdk", "3.0")
 require_version("Gtk", "3.0")
 from gi.repository import Gdk, GLib, Gtk
 
 if TYPE_CHECKING:
+    from hints.config import HintsConfig, WritePausesConfig
     from hints.mouse_enums import MouseButtonState
 
-MOUSE_SERVICE_LOOP_MS_INTERVAL = 10
+logger = logging.getLogger(__name__)
+
+CONNECTION_BACKLOG = 16
+ABSOLUTE_RESOLUTION = 2**16 - 1
 config = load_config()
 
+# a write to the mouse devices and the time to wait after it in seconds
+Step = tuple[Callable[[], None], float]
 
-class Mouse:
-    """Mouse class for performing mouse actions (click, hover, move, etc).
 
-    This uses uinput to support both X11 and Wayland.
+def get_mouse_mode_settings(
+    mode: int,
+) -> tuple[float, float, float, list[tuple[str, tuple[int, int]]]]:
+    """Get the settings for moving or scrolling with keys.
+
+    :param mode: The mouse mode.
+    :return: Sensitivity, rampup time, acceleration and the direction for
+        every key binding ((x, y) with y pointing down for moves and up
+        for scrolls).
+    """
+    if mode == MouseMode.MOVE.value:
+        return (
+            config.mouse_move_pixel_sensitivity,
+            config.mouse_move_rampup_time,
+            config.mouse_move_acceleration,
+            [
+                (config.mouse_move_left, (-1, 0)),
+                (config.mouse_move_right, (1, 0)),
+                (config.mouse_move_down, (0, 1)),
+                (config.mouse_move_up, (0, -1)),
+            ],
+        )
+
+    if mode == MouseMode.SCROLL.value:
+        return (
+            config.mouse_scroll_pixel_sensitivity,
+            config.mouse_scroll_rampup_time,
+            config.mouse_scroll_acceleration,
+            [
+                (config.mouse_scroll_left, (-1, 0)),
+                (config.mouse_scroll_right, (1, 0)),
+                (config.mouse_scroll_up, (0, 1)),
+                (config.mouse_scroll_down, (0, -1)),
+            ],
+        )
+
+    return 1, 1, 1, [("h", (-1, 0)), ("l", (1, 0)), ("k", (0, 1)), ("j", (0, -1))]
+
+
+class Action:
+    """A mouse action as a sequence of steps."""
+
+    def __init__(self, steps: list[Step] | None = None):
+        """Action constructor.
+
+        :param steps: Steps of the action.
+        """
+        self.steps = steps or []
+
+
+class ActionScheduler:
+    """Run mouse actions without blocking the main loop.
+
+    Steps are run from the main loop and the pauses between them are
+    waited for with GLib timeouts, so requests and events keep being
+    handled while an action runs. Actions are queued and run one after
+    another in the order they were scheduled.
+    """
+
+    def __init__(self):
+        """Action scheduler constructor."""
+        self.queue: deque[tuple[Action, Callable[[], None]]] = deque()
+        self.current: tuple[Iterator[Step], Callable[[], None]] | None = None
+        self.timeout_id = 0
+
+    def schedule(self, action: Action, on_done: Callable[[], None]):
+        """Schedule an action.
+
+        :param action: The action.
+        :param on_done: Called once the action is done.
+        """
+        self.queue.append((action, on_done))
+
+        if not self.timeout_id:
+            self.run()
+
+    def run(self) -> bool:
+        """Run steps until one needs a pause or every action is done."""
+        self.timeout_id = 0
+
+        while self.current or self.queue:
+            if not self.current:
+                action, on_done = self.queue.popleft()
+                self.current = (iter(action.steps), on_done)
+
+            steps, on_done = self.current
+            for step, pause in steps:
+                step()
+                if pause:
+                    self.timeout_id = GLib.timeout_add(round(pause * 1000), self.run)
+                    return GLib.SOURCE_REMOVE
+
+            self.current = None
+            on_done()
+
+        return GLib.SOURCE_REMOVE
+
+
+class EventBatch:
+    """Events of a logical mouse action, grouped into frames.
+
+    Each frame is written to a device followed by a single SYN. Events
+    are added to the last frame unless a pause is needed after it, it is
+    for another device, or it already has an event for the same code
+    (ex: a button going down then up has to be two frames).
     """
 
-    def __init__(self, abs_max_width=10000, abs_max_height=10000, write_pause=0.03):
+    def __init__(self):
+        """Event batch constructor."""
+        # device, events (type, code, value) and the pause after the frame
+        self.frames: list[tuple[UInput, list[tuple[int, int, int]], float]] = []
+
+    def add(self, device: UInput, events: list[tuple[int, int, int]], pause: float):
+        """Add events.
+
+        :param device: Device to write the events to.
+        :param events: Events (type, code, value).
+        :param pause: Seconds to wait after writing the events.
+        """
+        if not events:
+            return
+
+        if self.frames:
+            last_device, last_events, last_pause = self.frames[-1]
+            last_codes = {(event_type, code) for event_type, code, _ in last_events}
+            codes = {(event_type, code) for event_type, code, _ in events}
+
+            if not last_pause and last_device is device and not last_codes & codes:
+                self.frames[-1] = (device, last_events + events, pause)
+                return
+
+        self.frames.append((device, events, pause))
+
+    @staticmethod
+    def write_frame(device: UInput, events: list[tuple[int, int, int]]):
+        """Write a frame.
+
+        :param device: Device to write the events to.
+        :param events: Events (type, code, value).
+        """
+        for event_type, code, value in events:
+            device.write(event_type, code, value)
+        device.syn()
+
+    def write(self):
+        """Write every frame right away, without pauses."""
+        for device, events, _ in self.frames:
+            self.write_frame(device, events)
 
+    def to_action(self) -> Action:
+        """Get an action writing the frames with their pauses.
+
+        :return: The action.
+        """
+        return Action(
+            [
+                (partial(self.write_frame, device, events), pause)
+                for device, events, pause in self.frames
+            ]
+        )
+
+
+class DeviceManager:
+    """Uinput devices the mouse service writes to.
+
+    The devices are created once. The absolute device has a fixed high
+    resolution that positions are scaled to from the monitor layout, so
+    layout changes do not need new devices (which libinput and the
+    compositor take a moment to pick up, losing events meanwhile).
+    """
+
+    def __init__(self, layout: MonitorLayout):
+        """Device manager constructor.
+
+        :param layout: Monitor layout absolute positions are in.
+        """
         keys = [button.value for button in MouseButton]
-        self.write_pause = write_pause
+        self.layout = layout
+        self.last_absolute_position = (-1, -1)
 
         self.relative_mouse = UInput(
             {
@@ -67,7 +255,7 @@ class Mouse:
                         AbsInfo(
                             value=0,
                             min=0,
-                            max=abs_max_width,
+                            max=ABSOLUTE_RESOLUTION,
                             fuzz=0,
                             flat=0,
                             resolution=0,
@@ -78,7 +266,7 @@ class Mouse:
                         AbsInfo(
                             value=0,
                             min=0,
-                            max=abs_max_height,
+                            max=ABSOLUTE_RESOLUTION,
                             fuzz=0,
                             flat=0,
                             resolution=0,
@@ -89,48 +277,175 @@ class Mouse:
             name="Hints absolute mouse",
         )
 
-    def scroll(self, x: int, y: int, *_args, **_kwargs):
+    def to_absolute(self, x: float, y: float) -> tuple[int, int]:
+        """Scale a layout position to the absolute device's range.
+
+        The device's range is mapped to the bounding box of the monitors
+        (which can start at negative positions) the way libinput does,
+        (value - min) * size / (max - min + 1), and positions are scaled
+        to the middle of their pixel.
+
+        The kernel drops absolute events repeating the device's last
+        value, so moving to the same position twice would not move the
+        pointer if it was moved by another device since. When that
+        happens, the position is nudged by one unit, which is still in
+        the same pixel at this resolution.
+
+        :param x: X layout position, truncated to its pixel.
+        :param y: Y layout position, truncated to its pixel.
+        :return: The absolute device position.
+        """
+        left, top, width, height = self.layout.bounds
+        position = (
+            min(
+                max(int((int(x) - left + 0.5) * (ABSOLUTE_RESOLUTION + 1) / width), 0),
+                ABSOLUTE_RESOLUTION,
+            ),
+            min(
+                max(int((int(y) - top + 0.5) * (ABSOLUTE_RESOLUTION + 1) / height), 0),
+                ABSOLUTE_RESOLUTION,
+            ),
+        )
+
+        if position == self.last_absolute_position:
+            nudge = 1 if position[0] < ABSOLUTE_RESOLUTION else -1
+            position = (position[0] + nudge, position[1])
+
+        self.last_absolute_position = position
+        return position
+
+    def close(self):
+        """Close the devices."""
+        self.relative_mouse.close()
+        self.absolute_mouse.close()
+
+
+class Mouse:
+    """Mouse class for performing mouse actions (click, hover, move, etc).
+
+    This uses uinput to support both X11 and Wayland.
+    """
+
+    def __init__(
+        self,
+        devices: DeviceManager,
+        write_pauses: WritePausesConfig | None = None,
+    ):
+        """Mouse constructor.
+
+        :param devices: Devices to write to.
+        :param write_pauses: Seconds to wait after moves, button presses
+            and scrolls, the configured pauses if not given.
+        """
+        self.devices = devices
+        self._write_pauses = write_pauses
+
+    @property
+    def write_pauses(self) -> WritePausesConfig:
+        """Get the pauses to wait after writes.
+
+        :return: Write pauses.
+        """
+        return self._write_pauses or config.mouse_write_pauses
+
+    def add_scroll(self, batch: EventBatch, x: int, y: int):
+        """Add a scroll to a batch.
+
+        :param batch: The batch.
+        :param x: X scroll direction.
+        :param y: Y scroll direction.
+        """
+        batch.add(
+            self.devices.relative_mouse,
+            [
+                (ecodes.EV_REL, code, int(value))
+                for code, value in ((ecodes.REL_HWHEEL, x), (ecodes.REL_WHEEL, y))
+                if int(value)
+            ],
+            self.write_pauses.scroll,
+        )
+
+    def add_move(self, batch: EventBatch, x: float, y: float, absolute: bool):
+        """Add a move to a batch.
+
+        :param batch: The batch.
+        :param x: X move direction.
+        :param y: Y move direction.
+        :param absolute: Whether to move the mouse using an absolute
+            position.
+        """
+        if absolute:
+            absolute_x, absolute_y = self.devices.to_absolute(x, y)
+            batch.add(
+                self.devices.absolute_mouse,
+                [
+                    (ecodes.EV_ABS, ecodes.ABS_X, absolute_x),
+                    (ecodes.EV_ABS, ecodes.ABS_Y, absolute_y),
+                ],
+                self.write_pauses.move,
+            )
+
+        else:
+            batch.add(
+                self.devices.relative_mouse,
+                [
+                    (ecodes.EV_REL, code, int(value))
+                    for code, value in ((ecodes.REL_X, x), (ecodes.REL_Y, y))
+                    if int(value)
+                ],
+                self.write_pauses.move,
+            )
+
+    def add_button(
+        self, batch: EventBatch, button: MouseButton, button_state: MouseButtonState
+    ):
+        """Add a button state to a batch.
+
+        :param batch: The batch.
+        :param button: The button.
+        :param button_state: The button state.
+        """
+        batch.add(
+            self.devices.relative_mouse,
+            [(ecodes.EV_KEY, button, button_state)],
+            self.write_pauses.button,
+        )
+
+    def scroll(self, x: int, y: int, *_args, **_kwargs) -> Action:
         """Scroll event.
 
         :param x: X scroll direction.
         :param y: Y scroll direction. :param *_args: Extra args to use
             the same interface as move. :param **_kwargs: Extra kwargs
             to use the same interface as move.
+        :return: The action.
         """
-        self.relative_mouse.write(ecodes.EV_REL, ecodes.REL_HWHEEL, int(x))
-        self.relative_mouse.write(ecodes.EV_REL, ecodes.REL_WHEEL, int(y))
-        self.relative_mouse.syn()
+        batch = EventBatch()
+        self.add_scroll(batch, x, y)
+        return batch.to_action()
 
-    def move(self, x: int, y: int, absolute: bool = True):
+    def move(self, x: float, y: float, absolute: bool = True) -> Action:
         """Move event.
 
         :param X: X move direction.
         :param y: Y move direction.
         :param absolute: Whether to move the mouse using an absolute
             position.
+        :return: The action.
         """
-
-        if absolute:
-            self.absolute_mouse.write(ecodes.EV_ABS, ecodes.ABS_X, int(x))
-            self.absolute_mouse.write(ecodes.EV_ABS, ecodes.ABS_Y, int(y))
-            self.absolute_mouse.syn()
-
-        else:
-            self.relative_mouse.write(ecodes.EV_REL, ecodes.REL_X, int(x))
-            self.relative_mouse.write(ecodes.EV_REL, ecodes.REL_Y, int(y))
-            self.relative_mouse.syn()
-
-        sleep(self.write_pause)
+        batch = EventBatch()
+        self.add_move(batch, x, y, absolute)
+        return batch.to_action()
 
     def click(
         self,
-        x: int,
-        y: int,
+        x: float,
+        y: float,
         button: MouseButton,
         button_states: Iterable[MouseButtonState],
         repeat: int = 1,
         absolute: bool = True,
-    ):
+    ) -> Action:
         """Click event.
 
         :param x: X position to click.
@@ -140,81 +455,155 @@ class Mouse:
             / button up).
         :param repeat: Times to repeat a click.
         :param absolute: Whether the click position is absolute.
+        :return: The action.
         """
-        self.move(x, y, absolute=absolute)
+        batch = EventBatch()
+        self.add_move(batch, x, y, absolute)
 
         for _ in range(repeat):
             for button_state in button_states:
-                self.relative_mouse.write(ecodes.EV_KEY, button, button_state)
-                self.relative_mouse.syn()
-                sleep(self.write_pause)
+                self.add_button(batch, button, button_state)
 
-        if absolute:
-            # small move to clear previous write incase the previous move wants
-            # to be repeated
-            self.move(x + 1, y, absolute=True)
-            self.move(x - 1, y, absolute=True)
+        return batch.to_action()
 
-    def do_mouse_action(
-        self,
-        key_press_state: dict[str, Any],
-        key: str,
-        mode: MouseMode,
-    ):
-        """Perform mouse action.
 
-        :param key_press_state: State containing key press event data
-            used for ramping up speeds.
-        :param key: The key to perform a mouse action for.
+class HeldKeyMotion:
+    """Move or scroll the mouse while keys are held.
+
+    Clients send when a key goes down and up, and motion is generated
+    every tick from how long keys have been held, so its speed does not
+    depend on the keyboard's repeat rate. The sensitivity is the
+    distance of a step at mouse_steps_per_second steps a second and
+    after the rampup time, the speed grows by the acceleration times the
+    initial speed every second.
+    """
+
+    def __init__(self, mouse: Mouse):
+        """Held key motion constructor.
+
+        :param mouse: The mouse to move or scroll.
+        """
+        self.mouse = mouse
+        # key: (mode, direction, time it went down)
+        self.held_keys: dict[str, tuple[int, tuple[int, int], float]] = {}
+        # fractions of a pixel / scroll step carried over to the next tick
+        self.remainders: dict[int, list[float]] = {}
+        self.last_tick = 0.0
+        self.timeout_id = 0
+
+    def key_down(self, key: str, mode: int):
+        """Start moving or scrolling for a key.
+
+        :param key: The key.
+        :param mode: The mouse mode.
+        """
+        if key in self.held_keys:
+            return
+
+        sensitivity, _, _, key_bindings = get_mouse_mode_settings(mode)
+        direction = (
+            sum(x for binding, (x, _) in key_bindings if binding == key),
+            sum(y for binding, (_, y) in key_bindings if binding == key),
+        )
+
+        if direction == (0, 0):
+            return
+
+        # respond to the press right away, ticks take over from there
+        self.write(mode, direction[0] * sensitivity, direction[1] * sensitivity)
+
+        self.held_keys[key] = (mode, direction, monotonic())
+
+        if not self.timeout_id:
+            self.last_tick = monotonic()
+            self.timeout_id = GLib.timeout_add(config.mouse_tick_ms, self.tick)
+
+    def key_up(self, key: str):
+        """Stop moving or scrolling for a key.
+
+        :param key: The key.
+        """
+        self.held_keys.pop(key, None)
+
+        if not self.held_keys:
+            self.stop()
+
+    def stop(self):
+        """Stop moving or scrolling for every key."""
+        self.held_keys.clear()
+        self.remainders.clear()
+
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = 0
+
+    def write(self, mode: int, x: float, y: float):
+        """Move or scroll by whole steps, carrying the rest over.
+
         :param mode: The mouse mode.
+        :param x: X distance.
+        :param y: Y distance.
         """
-        key_press_state.setdefault("start_time", time())
-
-        sensitivity = 1
-        rampup_time = 1
-        mouse_navigation_action = self.move
-        left = "h"
-        right = "l"
-        up = "k"
-        down = "j"
-
-        if mode == MouseMode.MOVE.value:
-            sensitivity = config["mouse_move_pixel_sensitivity"]
-            rampup_time = config["mouse_move_rampup_time"]
-            left = config["mouse_move_left"]
-            right = config["mouse_move_right"]
-
-            # up and down are intentionally switched to keep the logic the same
-            # as scrol
-            up = config["mouse_move_down"]
-            down = config["mouse_move_up"]
-
-            mouse_navigation_action = self.move
-
-        elif mode == MouseMode.SCROLL.value:
-            sensitivity = config["mouse_scroll_pixel_sensitivity"]
-            rampup_time = config["mouse_scroll_rampup_time"]
-            left = config["mouse_scroll_left"]
-            right = config["mouse_scroll_right"]
-            up = config["mouse_scroll_up"]
-            down = config["mouse_scroll_down"]
-            mouse_navigation_action = self.scroll
-
-        key_press_state.setdefault("sensitivity", sensitivity)
-
-        if time() - key_press_state["start_time"] >= rampup_time:
-            key_press_state["sensitivity"] += sensitivity
-
-        if key == left:
-            mouse_navigation_action(-key_press_state["sensitivity"], 0, absolute=False)
-        if key == right:
-            mouse_navigation_action(key_press_state["sensitivity"], 0, absolute=False)
-        if key == up:
-            mouse_navigation_action(0, key_press_state["sensitivity"], absolute=False)
-        if key == down:
-            mouse_navigation_action(0, -key_press_state["sensitivity"], absolute=False)
-
-        return key_press_state
+        remainder = self.remainders.setdefault(mode, [0.0, 0.0])
+        x += remainder[0]
+        y += remainder[1]
+        remainder[0] = x - int(x)
+        remainder[1] = y - int(y)
+
+        batch = EventBatch()
+
+        if mode == MouseMode.SCROLL.value:
+            self.mouse.add_scroll(batch, x, y)
+        else:
+            self.mouse.add_move(batch, x, y, absolute=False)
+
+        batch.write()
+
+    def tick(self) -> bool:
+        """Move or scroll for the time since the last tick."""
+        now = monotonic()
+        elapsed = now - self.last_tick
+        self.last_tick = now
+        distances: dict[int, list[float]] = {}
+
+        for key, (_, _, start_time) in list(self.held_keys.items()):
+            if now - start_time > config.mouse_max_hold_time:
+                logger.warning("%r held for too long, releasing it", key)
+                self.key_up(key)
+
+        if not self.timeout_id:
+            return GLib.SOURCE_REMOVE
+
+        for mode, (x, y), start_time in self.held_keys.values():
+            sensitivity, rampup_time, acceleration, _ = get_mouse_mode_settings(mode)
+            speed = (
+                sensitivity
+                * config.mouse_steps_per_second
+                * (1 + acceleration * max(0, now - start_time - rampup_time))
+            )
+            distance = distances.setdefault(mode, [0.0, 0.0])
+            distance[0] += x * speed * elapsed
+            distance[1] += y * speed * elapsed
+
+        for mode, (x, y) in distances.items():
+            self.write(mode, x, y)
+
+        return GLib.SOURCE_CONTINUE
+
+
+class ClientConnection:
+    """Connection from a client to the mouse service."""
+
+    def __init__(self, connection: socket.socket):
+        """Client connection constructor.
+
+        :param connection: The connection's socket.
+        """
+        self.socket = connection
+        self.decoder = FrameDecoder()
+        self.watch_id = 0
+        # keys held down by the client, released if it goes away
+        self.held_keys: set[str] = set()
 
 
 class MouseService:
@@ -228,8 +617,13 @@ class MouseService:
         """Mouse Service Constructor."""
         Gtk.init()
 
-        self.screen = Gdk.Screen.get_default()
-        self.mouse = Mouse(self.screen.get_width(), self.screen.get_height())
+        self.layout = MonitorLayout(Gdk.Display.get_default())
+        self.layout.watch()
+        self.devices = DeviceManager(self.layout)
+        self.mouse = Mouse(self.devices)
+        self.scheduler = ActionScheduler()
+        self.held_key_motion = HeldKeyMotion(self.mouse)
+        self.config_monitor = watch_config(self.on_config_changed)
 
         if path.exists(UNIX_DOMAIN_SOCKET_FILE):
             remove(UNIX_DOMAIN_SOCKET_FILE)
@@ -238,49 +632,191 @@ class MouseService:
             socket.AF_UNIX, socket.SOCK_STREAM | socket.SOCK_NONBLOCK
         )
         self.socket.bind(UNIX_DOMAIN_SOCKET_FILE)
-        self.socket.listen(1)
-        GLib.timeout_add(MOUSE_SERVICE_LOOP_MS_INTERVAL, self.socket_connection)
+        self.socket.listen(CONNECTION_BACKLOG)
+        # clients keep their connection open and can send several requests
+        self.connections: list[ClientConnection] = []
+
+        # the main loop only wakes up when there is something to handle, so
+        # hintsd does not use any CPU while idle.
+        self.socket_watch_id = GLib.io_add_watch(
+            self.socket.fileno(),
+            GLib.PRIORITY_DEFAULT,
+            GLib.IOCondition.IN,
+            self.on_connection,
+        )
+
+        # handled in the main loop, python signal handlers only run when the
+        # interpreter gets control, which it does not while idle.
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, SIGINT, self.on_interrupt)
 
-        self.screen.connect("size-changed", self.on_size_changed)
-        signal(SIGINT, self.on_interrupt)
+    def on_config_changed(self, new_config: HintsConfig):
+        """Use the reloaded config for the next actions.
 
-    def on_interrupt(self, *_):
+        :param new_config: Reloaded config.
+        """
+        global config
+        config = new_config
+
+    def on_interrupt(self, *_) -> bool:
         """Interrupt handler to clean up."""
+        for connection in list(self.connections):
+            self.close_connection(connection)
+        self.config_monitor.cancel()
+        GLib.source_remove(self.socket_watch_id)
         self.socket.close()
+        self.held_key_motion.stop()
+        self.devices.close()
         Gtk.main_quit()
 
-    def on_size_changed(self, screen: Gdk.Screen):
-        """Screen size change event handler to update the mouse device min/max
-        values for correct absolute position movement.
+        return GLib.SOURCE_REMOVE
 
-        :param screen: The screen object for the event.
+    def handle_request(
+        self,
+        connection: ClientConnection,
+        payload: bytes,
+        on_response: Callable[[bytes], None],
+    ):
+        """Handle a request from a client.
+
+        The request's action is scheduled and on_response is called once
+        it is done.
+
+        :param connection: The connection the request came from.
+        :param payload: The encoded request.
+        :param on_response: Called with the encoded response.
+        :raises ProtocolError: When the request is malformed.
         """
-        self.mouse = Mouse(screen.get_width(), screen.get_height())
+        opcode, fields, extra, trace_id = decode_request(payload)
+
+        request_tracer = Tracer()
+        if trace_id:
+            request_tracer.enable(trace_id)
+
+        span = request_tracer.start_span(f"hintsd.{opcode.name.lower()}")
+
+        match opcode:
+            case Opcode.MOVE:
+                x, y, absolute = fields
+                action = self.mouse.move(x, y, absolute=absolute)
+            case Opcode.CLICK:
+                x, y, button, repeat, absolute = fields
+                action = self.mouse.click(
+                    x, y, button, list(extra), repeat=repeat, absolute=absolute
+                )
+            case Opcode.SCROLL:
+                action = self.mouse.scroll(*fields)
+            case Opcode.KEY_DOWN:
+                key, mode = fields
+                connection.held_keys.add(chr(key))
+                action = Action(
+                    [(partial(self.held_key_motion.key_down, chr(key), mode), 0)]
+                )
+            case Opcode.KEY_UP:
+                (key,) = fields
+                connection.held_keys.discard(chr(key))
+                action = Action([(partial(self.held_key_motion.key_up, chr(key)), 0)])
 
-    def socket_connection(self):
-        """Handle socket connection events.
+        def on_done():
+            request_tracer.end_span(span)
+            on_response(encode_response(request_tracer.spans if trace_id else None))
+
+        self.scheduler.schedule(action, on_done)
+
+    def send_response(
+        self, connection: ClientConnection, request_id: int, response: bytes
+    ):
+        """Send the response to a request.
+
+        :param connection: The connection the request came from.
+        :param request_id: Id of the request.
+        :param response: The encoded response.
+        """
+        if connection not in self.connections:
+            # the client went away while the action was running
+            return
+
+        try:
+            connection.socket.sendall(encode_frame(request_id, response))
+        except OSError:
+            self.close_connection(connection)
+
+    def close_connection(self, connection: ClientConnection):
+        """Close a client connection.
+
+        :param connection: The connection.
+        """
+        GLib.source_remove(connection.watch_id)
+        self.connections.remove(connection)
+        connection.socket.close()
+
+        for key in connection.held_keys:
+            self.held_key_motion.key_up(key)
+
+    def on_connection(self, *_) -> bool:
+        """Accept client connections.
+
+        Every connection waiting to be accepted is accepted at once.
+        """
+        while True:
+            try:
+                client_socket, _ = self.socket.accept()
+            except BlockingIOError:
+                break
+
+            client_socket.setblocking(True)
+            connection = ClientConnection(client_socket)
+            connection.watch_id = GLib.io_add_watch(
+                client_socket.fileno(),
+                GLib.PRIORITY_DEFAULT,
+                GLib.IOCondition.IN | GLib.IOCondition.HUP | GLib.IOCondition.ERR,
+                self.on_request,
+                connection,
+            )
+            self.connections.append(connection)
+
+        return GLib.SOURCE_CONTINUE
+
+    def on_request(
+        self, _fd: int, condition: GLib.IOCondition, connection: ClientConnection
+    ) -> bool:
+        """Handle requests from a client connection.
 
         This is how the main hints process and the mouse service
         communicate.
+
+        :param _fd: File descriptor of the connection.
+        :param condition: The condition that triggered the event.
+        :param connection: The connection.
         """
+        data = b""
+        if condition & GLib.IOCondition.IN:
+            try:
+                data = connection.socket.recv(SOCKET_MESSAGE_SIZE)
+            except OSError:
+                pass
+
+        if not data:
+            # closed by the client
+            self.close_connection(connection)
+            return GLib.SOURCE_REMOVE
+
         try:
-            connection, _ = self.socket.accept()
-            payload = loads(connection.recv(SOCKET_MESSAGE_SIZE))
-            method = payload.get("method", "")
-            args = payload.get("args", ())
-            kwargs = payload.get("kwargs", {})
-            connection.send(
-                dumps(
-                    {
-                        "click": self.mouse.click,
-                        "move": self.mouse.move,
-                        "scoll": self.mouse.scroll,
-                        "do_mouse_action": self.mouse.do_mouse_action,
-                    }[method](*args, **kwargs)
+            for request_id, payload in connection.decoder.feed(data):
+                self.handle_request(
+                    connection,
+                    payload,
+                    partial(self.send_response, connection, request_id),
                 )
-            )
-        except BlockingIOError:
-            pass
+        except ProtocolError as error:
+            logger.warning("Closing a client connection: %s", error)
+            self.close_connection(connection)
+            return GLib.SOURCE_REMOVE
+        except Exception:
+            # the watch is removed when a callback raises, the connection
+            # must not outlive it (its held keys would stay down).
+            logger.exception("Closing a client connection after an error.")
+            self.close_connection(connection)
+            return GLib.SOURCE_REMOVE
 
         return GLib.SOURCE_CONTINUE
 
@@ -0,0 +1,173 @@
+"""Latency tracing.
+
+Spans are recorded with monotonic timestamps (CLOCK_MONOTONIC is shared
+by every process on the machine), so spans recorded by hintsd for a
+request line up with the spans recorded by hints when both carry the
+same trace ID. Traces can be exported as Chrome trace-event JSON (load
+it in chrome://tracing or https://ui.perfetto.dev) or as a compact text
+summary.
+"""
+
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from functools import wraps
+from json import dump
+from os import getpid
+from threading import Lock, get_ident
+from time import monotonic_ns
+from typing import Any, Callable, Iterator
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+Span = dict[str, Any]
+
+
+class Tracer:
+    """Record spans for a trace."""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_id = ""
+        self.spans: list[Span] = []
+        self._lock = Lock()
+
+    def enable(self, trace_id: str = ""):
+        """Enable tracing.
+
+        :param trace_id: The ID of the trace, a new one is created if not
+            given.
+        """
+        self.enabled = True
+        self.trace_id = trace_id or uuid4().hex
+
+    def start_span(self, name: str, **args) -> Span:
+        """Start a span, for spans that do not fit in a context (like spans
+        ending in a callback).
+
+        :param name: Name of the span.
+        :param args: Extra information to attach to the span.
+        :return: The span, to pass to end_span.
+        """
+        span: Span = {"name": name, "args": args}
+
+        if self.enabled:
+            span.update({"pid": getpid(), "tid": get_ident(), "ts": monotonic_ns()})
+
+        return span
+
+    def end_span(self, span: Span):
+        """End a span started with start_span.
+
+        :param span: The span.
+        """
+        if not self.enabled:
+            return
+
+        span["dur"] = monotonic_ns() - span["ts"]
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[Span]:
+        """Record a span for the duration of the context.
+
+        :param name: Name of the span.
+        :param args: Extra information to attach to the span.
+        :return: The span, args can be updated while the span is open.
+        """
+        span = self.start_span(name, **args)
+
+        try:
+            yield span
+        finally:
+            self.end_span(span)
+
+    def add_spans(self, spans: list[Span]):
+        """Add spans recorded elsewhere (like by hintsd).
+
+        :param spans: Spans to add.
+        """
+        with self._lock:
+            self.spans.extend(spans)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Get the trace in the Chrome trace-event format.
+
+        :return: Chrome trace-event object.
+        """
+        return {
+            "traceEvents": [
+                {
+                    "name": span["name"],
+                    "ph": "X",
+                    "ts": span["ts"] / 1000,
+                    "dur": span["dur"] / 1000,
+                    "pid": span["pid"],
+                    "tid": span["tid"],
+                    "args": {"trace_id": self.trace_id, **span["args"]},
+                }
+                for span in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def summary(self) -> str:
+        """Get a compact text summary of the trace.
+
+        :return: One line per span, ordered by start time, with offsets
+            relative to the first span.
+        """
+        if not self.spans:
+            return f"trace {self.trace_id}: no spans"
+
+        spans = sorted(self.spans, key=lambda span: span["ts"])
+        start = spans[0]["ts"]
+        lines = [f"trace {self.trace_id}:"]
+
+        for span in spans:
+            lines.append(
+                f"  +{(span['ts'] - start) / 1e6:9.3f}ms"
+                f" {span['dur'] / 1e6:9.3f}ms"
+                f" [{span['pid']}] {span['name']}"
+            )
+
+        return "\n".join(lines)
+
+    def export(self, trace_file: str, trace_format: str = "chrome"):
+        """Write the trace to a file.
+
+        :param trace_file: File to write the trace to.
+        :param trace_format: "chrome" for Chrome trace-event JSON or
+            "text" for a compact summary.
+        """
+        with open(trace_file, "w", encoding="utf-8") as _f:
+            if trace_format == "text":
+                _f.write(self.summary() + "\n")
+            else:
+                dump(self.to_chrome_trace(), _f)
+
+        logger.debug("Wrote trace %s to %s", self.trace_id, trace_file)
+
+
+tracer = Tracer()
+
+
+def traced(name: str) -> Callable:
+    """Decorator to record a span for every call to a function.
+
+    :param name: Name of the span.
+    :return: Decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
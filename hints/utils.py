@@ -1,30 +1,54 @@
+from __future__ import annotations
+
+import logging
 from json import load
-from typing import Any
+from os import getuid, lstat
+from pathlib import Path
+from stat import S_ISDIR
+from typing import Callable
+
+from gi import require_version
+
+require_version("Gio", "2.0")
+from gi.repository import Gio
+
+from hints.config import HintsConfig
+from hints.constants import CACHE_DIRECTORY, CONFIG_PATH, DEFAULT_CONFIG
 
-from hints.constants import CONFIG_PATH, DEFAULT_CONFIG
+logger = logging.getLogger(__name__)
 
-HintsConfig = dict[str, Any]
 
+def get_cache_directory() -> Path:
+    """Get the cache directory, creating it if needed.
 
-def merge_configs(source: HintsConfig, destination: HintsConfig) -> HintsConfig:
-    """Deepmerge configs recursively.
+    Cached files are only trusted in a directory that belongs to the user
+    and that other users cannot access, so they cannot be planted or
+    replaced by anyone else.
 
-    :param source: Source config.
-    :param destination: Destination config.
-    :return: Destination config.
+    :return: The cache directory.
+    :raises PermissionError: When the cache directory is not owned by the
+        user or is accessible to other users.
     """
-    for key, value in source.items():
-        if isinstance(value, dict):
-            node = destination.setdefault(key, {})
-            merge_configs(value, node)
-        else:
-            destination[key] = value
+    CACHE_DIRECTORY.mkdir(mode=0o700, parents=True, exist_ok=True)
+    directory_stat = lstat(CACHE_DIRECTORY)
 
-    return destination
+    if (
+        not S_ISDIR(directory_stat.st_mode)
+        or directory_stat.st_uid != getuid()
+        or directory_stat.st_mode & 0o077
+    ):
+        raise PermissionError(
+            f"{CACHE_DIRECTORY} is not a directory private to the user."
+        )
+
+    return CACHE_DIRECTORY
 
 
 def load_config() -> HintsConfig:
-    """Load Json config file.
+    """Load the Json config file and resolve it over the defaults.
+
+    The defaults are not modified, the config file is a layer on top of
+    them.
 
     :return: config object.
     """
@@ -36,4 +60,40 @@ def load_config() -> HintsConfig:
     except FileNotFoundError:
         pass
 
-    return merge_configs(config, DEFAULT_CONFIG)
+    return HintsConfig(DEFAULT_CONFIG, config)
+
+
+def watch_config(on_change: Callable[[HintsConfig], None]) -> Gio.FileMonitor:
+    """Reload the config when the config file changes, for resident
+    processes.
+
+    :param on_change: Called with the reloaded config.
+    :return: The file monitor, it needs to be kept referenced for the
+        config to be watched.
+    """
+
+    def on_config_file_changed(_monitor, _file, _other_file, event_type):
+        if event_type not in (
+            Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+            Gio.FileMonitorEvent.CREATED,
+            Gio.FileMonitorEvent.DELETED,
+            Gio.FileMonitorEvent.MOVED_IN,
+            Gio.FileMonitorEvent.RENAMED,
+        ):
+            return
+
+        try:
+            config = load_config()
+        except (ValueError, TypeError) as error:
+            logger.warning("Could not reload the config: %s", error)
+            return
+
+        logger.debug("Reloaded the config.")
+        on_change(config)
+
+    monitor = Gio.File.new_for_path(CONFIG_PATH).monitor_file(
+        Gio.FileMonitorFlags.WATCH_MOVES, None
+    )
+    monitor.connect("changed", on_config_file_changed)
+
+    return monitor
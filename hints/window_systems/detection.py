@@ -0,0 +1,162 @@
+"""Wayland window system detection.
+
+Cheap signals are checked first: environment variables set by the
+compositor, then the session bus names owned by KWin and GNOME Shell.
+Only when none of them match are running processes scanned (through
+/proc, without spawning any). The result is cached for the session in
+$XDG_RUNTIME_DIR, keyed by $XDG_SESSION_ID.
+"""
+
+from __future__ import annotations
+
+import logging
+from os import getenv, listdir
+from pathlib import Path
+
+from gi import require_version
+
+require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+
+from hints.constants import CACHE_DIRECTORY
+from hints.utils import get_cache_directory
+
+logger = logging.getLogger(__name__)
+
+# environment variables set by compositors
+ENVIRONMENT_WINDOW_SYSTEMS = {
+    "SWAYSOCK": "sway",
+    "HYPRLAND_INSTANCE_SIGNATURE": "hyprland",
+}
+# desktop names in $XDG_CURRENT_DESKTOP (lowercase)
+DESKTOP_WINDOW_SYSTEMS = {
+    "sway": "sway",
+    "hyprland": "hyprland",
+    "kde": "plasmashell",
+    "gnome": "gnome-shell",
+}
+# session bus names owned by compositors
+DBUS_WINDOW_SYSTEMS = {
+    "org.kde.KWin": "plasmashell",
+    "org.gnome.Shell": "gnome-shell",
+}
+# process names (as in /proc/<pid>/comm) of compositors
+PROCESS_WINDOW_SYSTEMS = {
+    "sway": "sway",
+    "Hyprland": "hyprland",
+    "plasmashell": "plasmashell",
+    "gnome-shell": "gnome-shell",
+}
+DBUS_TIMEOUT_MS = 100
+
+
+def detect_from_environment() -> str:
+    """Detect the window system from environment variables.
+
+    :return: The window system id, empty if not detected.
+    """
+    for variable, window_system_id in ENVIRONMENT_WINDOW_SYSTEMS.items():
+        if getenv(variable):
+            return window_system_id
+
+    for desktop in getenv("XDG_CURRENT_DESKTOP", "").lower().split(":"):
+        if desktop in DESKTOP_WINDOW_SYSTEMS:
+            return DESKTOP_WINDOW_SYSTEMS[desktop]
+
+    return ""
+
+
+def detect_from_dbus() -> str:
+    """Detect the window system from the names owned on the session bus.
+
+    :return: The window system id, empty if not detected.
+    """
+    try:
+        bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+
+        for name, window_system_id in DBUS_WINDOW_SYSTEMS.items():
+            (has_owner,) = bus.call_sync(
+                "org.freedesktop.DBus",
+                "/org/freedesktop/DBus",
+                "org.freedesktop.DBus",
+                "NameHasOwner",
+                GLib.Variant("(s)", (name,)),
+                GLib.VariantType("(b)"),
+                Gio.DBusCallFlags.NONE,
+                DBUS_TIMEOUT_MS,
+                None,
+            ).unpack()
+            if has_owner:
+                return window_system_id
+    except GLib.Error as error:
+        logger.debug("Could not query the session bus: %s", error)
+
+    return ""
+
+
+def detect_from_processes() -> str:
+    """Detect the window system from running processes.
+
+    :return: The window system id, empty if not detected.
+    """
+    for pid in listdir("/proc"):
+        if not pid.isdigit():
+            continue
+
+        try:
+            with open(f"/proc/{pid}/comm", encoding="utf-8") as _f:
+                process_name = _f.read().strip()
+        except OSError:
+            # the process exited or is not readable
+            continue
+
+        if process_name in PROCESS_WINDOW_SYSTEMS:
+            return PROCESS_WINDOW_SYSTEMS[process_name]
+
+    return ""
+
+
+def get_session_cache_file() -> Path | None:
+    """Get the file the session's window system is cached in.
+
+    :return: The cache file, None without a session id.
+    """
+    session_id = getenv("XDG_SESSION_ID", "")
+    if not session_id:
+        return None
+
+    return CACHE_DIRECTORY / f"window_system-{session_id}"
+
+
+def detect_wayland_window_system() -> str:
+    """Detect the Wayland window system.
+
+    :return: The window system id, empty if not detected.
+    """
+    if window_system_id := detect_from_environment():
+        logger.debug("Detected %s from the environment.", window_system_id)
+        return window_system_id
+
+    cache_file = get_session_cache_file()
+    if cache_file:
+        try:
+            get_cache_directory()
+            return cache_file.read_text(encoding="utf-8")
+        except OSError:
+            pass
+
+    window_system_id = detect_from_dbus()
+    if window_system_id:
+        logger.debug("Detected %s from the session bus.", window_system_id)
+    else:
+        window_system_id = detect_from_processes()
+        logger.debug("Detected '%s' from running processes.", window_system_id)
+
+    if cache_file and window_system_id:
+        try:
+            get_cache_directory()
+            cache_file.write_text(window_system_id, encoding="utf-8")
+        except OSError as error:
+            logger.debug("Could not cache the window system: %s", error)
+
+    return window_system_id
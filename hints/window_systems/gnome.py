@@ -6,8 +6,10 @@
 #
 # from gi.repository import Wnck
 
+from gi.repository import GLib
+
 from hints.window_systems.window_system import WindowSystem
-from hints.dbus import DBusHintsProxy
+from hints.dbus import NO_FOCUSED_WINDOW, DBusHintsProxy
 
 
 class Gnome(WindowSystem):
@@ -15,9 +17,30 @@ class Gnome(WindowSystem):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        dbus_proxy = DBusHintsProxy.get_instance()
-        self.window_info: tuple[int, int, int, int, int, str, int] = \
-                dbus_proxy.get_focused_window_info()
+        # the extension answers while hints does other work (ex: Atspi
+        # listing applications), the answer is only waited for when needed.
+        self.dbus_proxy = DBusHintsProxy.get_instance(
+            self.config.gnome_extension_timeouts
+        )
+        self.pending_window_info = self.dbus_proxy.get_focused_window_info_async()
+        self._window_info: tuple[int, int, int, int, int, str, int] | None = None
+
+    def resolve(self):
+        """Wait for the focused window info from the extension."""
+        if self._window_info is None:
+            try:
+                self._window_info = self.pending_window_info.result()  # type: ignore
+            except GLib.Error:
+                self._window_info = NO_FOCUSED_WINDOW
+
+    @property
+    def window_info(self) -> tuple[int, int, int, int, int, str, int]:
+        """Get the focused window info from the extension.
+
+        :return: x, y, width, height, pid, name, monitor.
+        """
+        self.resolve()
+        return self._window_info  # type: ignore
 
     @property
     def window_system_name(self) -> str:
@@ -13,8 +13,8 @@ from hints.window_systems.window_system import WindowSystem
 class Plasmashell(WindowSystem):
     """Sway Window system class."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
 
         with as_file(
             files("hints") / "scripts/kwin/active_window_information.mjs"
@@ -9,8 +9,8 @@ from hints.window_systems.window_system import WindowSystem
 class Sway(WindowSystem):
     """Sway Window system class."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.focused_window = self._get_focused_window_from_sway_tree()
         self.focused_workspace = self._get_focused_workspace_from_sway_tree()
         self.focused_output = self._get_focused_output_from_sway_tree()
@@ -7,12 +7,20 @@ from typing import TYPE_CHECKING
 from hints.window_systems.window_system_type import get_window_system_type
 
 if TYPE_CHECKING:
+    from hints.config import HintsConfig
     from hints.window_systems.window_system_type import WindowSystemType
 
 
 class WindowSystem:
     """Linux base window system class."""
 
+    def __init__(self, config: HintsConfig):
+        """Window system constructor.
+
+        :param config: Hints config.
+        """
+        self.config = config
+
     @property
     def window_system_type(self) -> WindowSystemType:
         """Get window_sysetm_type.
@@ -21,6 +29,13 @@ class WindowSystem:
         """
         return get_window_system_type()
 
+    def resolve(self):
+        """Read the focused window now if it is read lazily.
+
+        Backends can run in worker threads, so strategies call this on the
+        main thread before starting them.
+        """
+
     @property
     def window_system_name(self) -> str:
         """Get the name of the window syste.
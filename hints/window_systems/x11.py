@@ -19,6 +19,12 @@ class X11(WindowSystem):
         self.screen.force_update()
         self.active_window = self.screen.get_active_window()
 
+        # Wnck is not thread safe and backends can run in threads, so the
+        # active window information is read once up front.
+        self._geometry = self.active_window.get_geometry()
+        self._pid = self.active_window.get_pid()
+        self._class_instance_name = self.active_window.get_class_instance_name()
+
     @property
     def window_system_name(self) -> str:
         """Get the name of the window syste.
@@ -35,7 +41,7 @@ class X11(WindowSystem):
 
         :return: Active window extents (x, y, width, height).
         """
-        return self.active_window.get_geometry()
+        return self._geometry
 
     @property
     def focused_window_pid(self) -> int:
@@ -43,7 +49,7 @@ class X11(WindowSystem):
 
         :return: Process ID of focused window.
         """
-        return self.active_window.get_pid()
+        return self._pid
 
     @property
     def focused_applicaiton_name(self) -> str:
@@ -54,4 +60,4 @@ class X11(WindowSystem):
 
         :return: Focused application name.
         """
-        return self.active_window.get_class_instance_name()
+        return self._class_instance_name
@@ -0,0 +1,80 @@
+"""Tests for the hints <-> hintsd protocol."""
+
+from pytest import mark, raises
+
+from hints.mouse_protocol import (
+    MAX_CLICK_REPEAT,
+    FrameDecoder,
+    Opcode,
+    ProtocolError,
+    decode_request,
+    encode_frame,
+    encode_request,
+)
+
+BTN_LEFT = 0x110
+
+
+def round_trip(payloads: list[bytes], chunk_size: int) -> list[tuple[int, bytes]]:
+    """Frame payloads and decode them from a stream read in chunks.
+
+    :param payloads: Payloads to send.
+    :param chunk_size: Size of the reads.
+    :return: Decoded request ids and payloads.
+    """
+    stream = b"".join(
+        encode_frame(request_id, payload) for request_id, payload in enumerate(payloads)
+    )
+    decoder = FrameDecoder()
+    frames = []
+
+    for offset in range(0, len(stream), chunk_size):
+        frames += decoder.feed(stream[offset : offset + chunk_size])
+
+    return frames
+
+
+def test_requests_with_non_integer_positions_round_trip():
+    requests = [
+        (Opcode.MOVE, (960.5, 540.25, True), b""),
+        (Opcode.CLICK, (10.5, 20.75, BTN_LEFT, 2, True), bytes([1, 0])),
+        (Opcode.MOVE, (-3.5, 7.0, False), b""),
+    ]
+
+    payloads = [
+        encode_request(opcode, fields, extra, "trace")
+        for opcode, fields, extra in requests
+    ]
+    frames = round_trip(payloads, chunk_size=3)
+
+    assert [request_id for request_id, _ in frames] == [0, 1, 2]
+    for (_, payload), (opcode, fields, extra) in zip(frames, requests):
+        assert decode_request(payload) == (opcode, fields, extra, "trace")
+
+
+def test_click_repeat_is_capped():
+    def click(repeat: int) -> bytes:
+        return encode_request(Opcode.CLICK, (0.0, 0.0, BTN_LEFT, repeat, True))
+
+    assert decode_request(click(MAX_CLICK_REPEAT))[1][3] == MAX_CLICK_REPEAT
+
+    with raises(ProtocolError):
+        decode_request(click(MAX_CLICK_REPEAT + 1))
+
+
+@mark.parametrize(
+    "opcode, fields, extra",
+    [
+        (Opcode.MOVE, (float("nan"), 0.0, True), b""),
+        (Opcode.MOVE, (0.0, float("inf"), True), b""),
+        (Opcode.CLICK, (float("-inf"), 0.0, BTN_LEFT, 1, True), bytes([1, 0])),
+        (Opcode.CLICK, (0.0, 0.0, BTN_LEFT, 1, True), bytes([1, 2])),
+        (Opcode.KEY_DOWN, (0x200000, 1), b""),
+        (Opcode.KEY_UP, (0x110000,), b""),
+        (Opcode.KEY_DOWN, (ord("h"), 9), b""),
+        (Opcode.KEY_DOWN, (ord("h"), 0), b""),
+    ],
+)
+def test_out_of_range_requests_are_rejected(opcode, fields, extra):
+    with raises(ProtocolError):
+        decode_request(encode_request(opcode, fields, extra))